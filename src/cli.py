@@ -2,8 +2,10 @@
 
 import os
 import json
+import mmap
 import logging
 import click
+import orjson
 from typing import Dict, Any, Optional
 from pathlib import Path
 from rich.console import Console
@@ -41,8 +43,9 @@ def load_config() -> Dict[str, Any]:
         raise click.ClickException("Configuration file not found. Please run setup first.")
     
     try:
-        with open(config_file) as f:
-            return json.load(f)
+        with open(config_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
     except Exception as e:
         raise click.ClickException(f"Error loading configuration: {e}")
 
@@ -50,8 +53,7 @@ def save_config(config: Dict[str, Any]) -> None:
     """Save configuration to file"""
     config_file = Path("config.json")
     try:
-        with open(config_file, "w") as f:
-            json.dump(config, f, indent=4)
+        config_file.write_text(json.dumps(config, indent=4))
     except Exception as e:
         raise click.ClickException(f"Error saving configuration: {e}")
 
@@ -79,7 +81,7 @@ def connect(uuid: str, name: str):
         else:
             click.echo("Failed to connect account. Check the logs for details.")
     except Exception as e:
-        logger.error(f"Error connecting account: {str(e)}")
+        logger.error("Error connecting account: %s", e)
         click.echo("An error occurred while connecting the account.")
 
 @earnapp.command()
@@ -95,11 +97,11 @@ def disconnect(uuid: str):
         else:
             click.echo("Failed to disconnect account. Check the logs for details.")
     except Exception as e:
-        logger.error(f"Error disconnecting account: {str(e)}")
+        logger.error("Error disconnecting account: %s", e)
         click.echo("An error occurred while disconnecting the account.")
 
-@earnapp.command()
-def list():
+@earnapp.command(name='list')
+def list_accounts():
     """List all connected EarnApp accounts"""
     try:
         container_manager = ContainerManager()
@@ -121,12 +123,12 @@ def list():
             click.echo("-" * 80)
             
     except Exception as e:
-        logger.error(f"Error listing accounts: {str(e)}")
+        logger.error("Error listing accounts: %s", e)
         click.echo("An error occurred while listing accounts.")
 
-@earnapp.command()
+@earnapp.command(name='status')
 @click.option('--uuid', prompt='Enter the EarnApp UUID', help='The UUID of the account to check')
-def status(uuid: str):
+def account_status(uuid: str):
     """Check status of an EarnApp account"""
     try:
         container_manager = ContainerManager()
@@ -145,7 +147,7 @@ def status(uuid: str):
             click.echo("Account not found.")
             
     except Exception as e:
-        logger.error(f"Error checking account status: {str(e)}")
+        logger.error("Error checking account status: %s", e)
         click.echo("An error occurred while checking account status.")
 
 @cli.command()
@@ -3,8 +3,10 @@
 import os
 import json
 import logging
+import itertools
+import threading
 import docker
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 from .container import ContainerManager
 from .network import NetworkManager
@@ -15,22 +17,32 @@ from .earnapp import EarnAppManager
 logger = logging.getLogger(__name__)
 
 class InstanceManager:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], proxy_handler: Optional[ProxyHandler] = None):
         self.config = config
         self.container_manager = ContainerManager()
         self.network_manager = NetworkManager(config)
-        self.proxy_handler = ProxyHandler(config)
+        if config.get("features", {}).get("proxy_verification", True):
+            self.network_manager.validate_all()
+        self.proxy_handler = proxy_handler or ProxyHandler(config)
         self.earnapp_manager = EarnAppManager(config)
         self.anti_detect = AntiDetectionSystem(config)
+        self._id_lock = threading.Lock()
+        self._pending_ids = set()
         
-    def create_instance(self) -> str:
-        """Create a new EarnApp instance"""
+    def create_instance(self, proxy_config: Optional[Dict[str, Any]] = None) -> str:
+        """Create a new EarnApp instance, on proxy_config if given or the next rotated proxy"""
+        instance_id = None
         try:
-            # Generate unique instance ID
-            instance_id = f"yashaoxen_earnapp_{len(self.get_running_instances())}"
+            # Generate unique instance ID (reserved so concurrent creates don't collide)
+            with self._id_lock:
+                instance_id = self._allocate_instance_id()
+                self._pending_ids.add(instance_id)
             
             # Get proxy and DNS for this instance
-            proxy = self.proxy_handler.get_next_proxy()
+            if proxy_config:
+                proxy = self._proxy_address(proxy_config)
+            else:
+                proxy = self.proxy_handler.get_next_proxy()
             dns = self.network_manager.get_next_dns()
             
             # Create container with network isolation
@@ -54,6 +66,22 @@ class InstanceManager:
         except Exception as e:
             logger.error(f"Error creating instance: {e}")
             raise
+        finally:
+            with self._id_lock:
+                self._pending_ids.discard(instance_id)
+    
+    def _allocate_instance_id(self) -> str:
+        """Lowest yashaoxen_earnapp_N not used by a container or a create in flight"""
+        used = {c['name'] for c in self.get_running_instances()} | self._pending_ids
+        return next(name for name in (f"yashaoxen_earnapp_{i}" for i in itertools.count()) if name not in used)
+    
+    @staticmethod
+    def _proxy_address(proxy_config: Dict[str, Any]) -> str:
+        """Format a host/port/username/password dict as [user:pass@]host:port, like the proxy list"""
+        address = f"{proxy_config['host']}:{proxy_config['port']}"
+        if proxy_config.get('username'):
+            address = f"{proxy_config['username']}:{proxy_config.get('password') or ''}@{address}"
+        return address
     
     def stop_instance(self, instance_id: str) -> None:
         """Stop an EarnApp instance"""
@@ -5,41 +5,113 @@ import psutil
 import json
 import time
 import requests
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
 from typing import Dict, Any, List
 from datetime import datetime
-from prometheus_client import start_http_server, Gauge, Counter
+from prometheus_client import Gauge, Counter, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+
+# Labels that would create one time series per instance/process and blow up scrape size
+HIGH_CARDINALITY_LABELS = frozenset({'instance_id', 'container_id', 'pid', 'proxy_host', 'tun_name'})
+
+# Bounded buckets for instance failure reasons
+FAILURE_CATEGORIES = {
+    'auth': ('auth', 'credential', 'token', 'unauthorized', 'forbidden', '401', '403', '407'),
+    'network': ('network', 'proxy', 'connect', 'timeout', 'timed out', 'dns', 'unreachable', 'refused'),
+    'quota': ('quota', 'limit', 'memory', 'resource', 'too many', '429'),
+}
+
+class _SnapshotHandler(BaseHTTPRequestHandler):
+    """Serve the last pre-encoded metrics snapshot without touching the registry"""
+    
+    def do_GET(self):
+        body = self.server.monitor._snapshot_bytes
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        pass
 
 class MonitoringSystem:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.metrics = {}
+        self._last = {}
+        self._stop = threading.Event()
         self.telegram_config = config['monitoring']['telegram_webhook']
         
         # Initialize Prometheus metrics
-        self.metrics['cpu_usage'] = Gauge('aethernode_cpu_usage_percent', 'CPU usage percentage')
-        self.metrics['memory_usage'] = Gauge('aethernode_memory_usage_percent', 'Memory usage percentage')
-        self.metrics['disk_usage'] = Gauge('aethernode_disk_usage_percent', 'Disk usage percentage')
-        self.metrics['instance_count'] = Gauge('aethernode_instance_count', 'Number of running instances')
-        self.metrics['failed_instances'] = Counter('aethernode_failed_instances_total', 'Total number of failed instance creations')
-        self.metrics['bandwidth_usage'] = Gauge('aethernode_bandwidth_usage_bytes', 'Current bandwidth usage in bytes')
+        self.metrics['cpu_usage'] = self._register_metric(Gauge, 'aethernode_cpu_usage_percent', 'CPU usage percentage')
+        self.metrics['memory_usage'] = self._register_metric(Gauge, 'aethernode_memory_usage_percent', 'Memory usage percentage')
+        self.metrics['disk_usage'] = self._register_metric(Gauge, 'aethernode_disk_usage_percent', 'Disk usage percentage')
+        self.metrics['instance_count'] = self._register_metric(Gauge, 'aethernode_instance_count', 'Number of running instances')
+        self.metrics['failed_instances'] = self._register_metric(
+            Counter, 'aethernode_failed_instances_total', 'Total number of failed instance creations',
+            labelnames=('category',)
+        )
+        self.metrics['bandwidth_usage'] = self._register_metric(Gauge, 'aethernode_bandwidth_usage_bytes', 'Current bandwidth usage in bytes')
+        
+        # Expose every failure category from the start so dashboards see zeros
+        for category in (*FAILURE_CATEGORIES, 'other'):
+            self.metrics['failed_instances'].labels(category=category)
         
         # Start Prometheus HTTP server
-        start_http_server(9100)
+        self._snapshot_bytes = generate_latest(REGISTRY)
+        self._start_metrics_server(9100)
+        
+    def _start_metrics_server(self, port: int):
+        """Serve metrics snapshots from a background HTTP server"""
+        server = ThreadingHTTPServer(('', port), _SnapshotHandler)
+        server.daemon_threads = True
+        server.monitor = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+    @staticmethod
+    def _register_metric(metric_type, name: str, documentation: str, labelnames=()):
+        """Create a Prometheus metric, rejecting unbounded per-instance labels"""
+        blocked = HIGH_CARDINALITY_LABELS.intersection(labelnames)
+        if blocked:
+            raise ValueError(f"High-cardinality labels not allowed on {name}: {sorted(blocked)}")
+        return metric_type(name, documentation, labelnames=labelnames)
+        
+    @staticmethod
+    def _categorize_failure(reason: str) -> str:
+        """Map a free-form failure reason to a bounded category"""
+        reason = reason.lower()
+        for category, keywords in FAILURE_CATEGORIES.items():
+            if any(keyword in reason for keyword in keywords):
+                return category
+        return 'other'
         
     def start_monitoring(self):
         """Start the monitoring loop"""
         self.logger.info("Starting monitoring system")
         
-        while True:
+        interval = self.config['monitoring']['metrics_interval']
+        deadline = time.monotonic() + interval
+        
+        while not self._stop.is_set():
             try:
                 self._collect_metrics()
                 self._check_alerts()
-                time.sleep(self.config['monitoring']['metrics_interval'])
             except Exception as e:
-                self.logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(60)  # Wait before retrying
+                self.logger.error("Error in monitoring loop: %s", e)
+                deadline = time.monotonic() + 60  # Wait before retrying
+                
+            self._stop.wait(max(0, deadline - time.monotonic()))
+            # Stay on the fixed schedule, but don't burst to catch up after overruns
+            deadline = max(deadline + interval, time.monotonic())
+            
+        self.logger.info("Monitoring system stopped")
+        
+    def stop(self):
+        """Stop the monitoring loop"""
+        self._stop.set()
                 
     def _collect_metrics(self):
         """Collect system and instance metrics"""
@@ -49,17 +121,17 @@ class MonitoringSystem:
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
-            self.metrics['cpu_usage'].set(cpu_percent)
-            self.metrics['memory_usage'].set(memory.percent)
-            self.metrics['disk_usage'].set(disk.percent)
+            self._set_metric('cpu_usage', cpu_percent)
+            self._set_metric('memory_usage', memory.percent)
+            self._set_metric('disk_usage', disk.percent)
             
             # Instance metrics
             instance_count = self._get_instance_count()
-            self.metrics['instance_count'].set(instance_count)
+            self._set_metric('instance_count', instance_count)
             
             # Network metrics
             net_io = psutil.net_io_counters()
-            self.metrics['bandwidth_usage'].set(net_io.bytes_sent + net_io.bytes_recv)
+            self._set_metric('bandwidth_usage', net_io.bytes_sent + net_io.bytes_recv)
             
             # Save metrics to file
             self._save_metrics({
@@ -71,33 +143,44 @@ class MonitoringSystem:
                 'bandwidth_usage': net_io.bytes_sent + net_io.bytes_recv
             })
             
+            # Encode the exposition once per tick; scrapes just send these bytes
+            self._snapshot_bytes = generate_latest(REGISTRY)
+            
         except Exception as e:
-            self.logger.error(f"Error collecting metrics: {e}")
+            self.logger.error("Error collecting metrics: %s", e)
             
+    def _set_metric(self, name: str, value: float):
+        """Set a gauge and remember the sampled value"""
+        self.metrics[name].set(value)
+        self._last[name] = value
+        
     def _check_alerts(self):
         """Check metrics against alert thresholds"""
         try:
             thresholds = self.telegram_config['alert_thresholds']
             alerts = []
+            cpu_usage = self._last.get('cpu_usage', 0)
+            memory_usage = self._last.get('memory_usage', 0)
+            disk_usage = self._last.get('disk_usage', 0)
             
             # Check CPU usage
-            if self.metrics['cpu_usage']._value > thresholds['cpu_usage']:
-                alerts.append(f"⚠️ High CPU usage: {self.metrics['cpu_usage']._value:.1f}%")
+            if cpu_usage > thresholds['cpu_usage']:
+                alerts.append(f"⚠️ High CPU usage: {cpu_usage:.1f}%")
                 
             # Check memory usage
-            if self.metrics['memory_usage']._value > thresholds['memory_usage']:
-                alerts.append(f"⚠️ High memory usage: {self.metrics['memory_usage']._value:.1f}%")
+            if memory_usage > thresholds['memory_usage']:
+                alerts.append(f"⚠️ High memory usage: {memory_usage:.1f}%")
                 
             # Check disk usage
-            if self.metrics['disk_usage']._value > thresholds['disk_usage']:
-                alerts.append(f"⚠️ High disk usage: {self.metrics['disk_usage']._value:.1f}%")
+            if disk_usage > thresholds['disk_usage']:
+                alerts.append(f"⚠️ High disk usage: {disk_usage:.1f}%")
                 
             # Send alerts if any
             if alerts and self.telegram_config['enabled']:
                 self._send_telegram_alert('\n'.join(alerts))
                 
         except Exception as e:
-            self.logger.error(f"Error checking alerts: {e}")
+            self.logger.error("Error checking alerts: %s", e)
             
     def _get_instance_count(self) -> int:
         """Get number of running instances"""
@@ -130,7 +213,7 @@ class MonitoringSystem:
                 json.dump(existing, f, indent=2)
                 
         except Exception as e:
-            self.logger.error(f"Error saving metrics: {e}")
+            self.logger.error("Error saving metrics: %s", e)
             
     def _send_telegram_alert(self, message: str):
         """Send alert to Telegram webhook"""
@@ -149,33 +232,35 @@ class MonitoringSystem:
             )
             
             if response.status_code != 200:
-                self.logger.error(f"Failed to send Telegram alert: {response.text}")
+                self.logger.error("Failed to send Telegram alert: %s", response.text)
                 
         except Exception as e:
-            self.logger.error(f"Error sending Telegram alert: {e}")
+            self.logger.error("Error sending Telegram alert: %s", e)
             
     def record_instance_failure(self, reason: str):
         """Record instance creation failure"""
         try:
-            self.metrics['failed_instances'].inc()
+            category = self._categorize_failure(reason)
+            self.metrics['failed_instances'].labels(category=category).inc()
+            self._last['failed_instances'] = self._last.get('failed_instances', 0) + 1
             
             if self.telegram_config['enabled'] and self.telegram_config['alert_thresholds']['instance_creation_failed']:
                 self._send_telegram_alert(f"❌ Instance creation failed\nReason: {reason}")
                 
         except Exception as e:
-            self.logger.error(f"Error recording instance failure: {e}")
+            self.logger.error("Error recording instance failure: %s", e)
             
     def get_system_status(self) -> Dict[str, Any]:
         """Get current system status"""
         try:
             return {
-                'cpu_usage': self.metrics['cpu_usage']._value,
-                'memory_usage': self.metrics['memory_usage']._value,
-                'disk_usage': self.metrics['disk_usage']._value,
-                'instance_count': self.metrics['instance_count']._value,
-                'bandwidth_usage': self.metrics['bandwidth_usage']._value,
-                'failed_instances': self.metrics['failed_instances']._value
+                'cpu_usage': self._last.get('cpu_usage', 0),
+                'memory_usage': self._last.get('memory_usage', 0),
+                'disk_usage': self._last.get('disk_usage', 0),
+                'instance_count': self._last.get('instance_count', 0),
+                'bandwidth_usage': self._last.get('bandwidth_usage', 0),
+                'failed_instances': self._last.get('failed_instances', 0)
             }
         except Exception as e:
-            self.logger.error(f"Error getting system status: {e}")
+            self.logger.error("Error getting system status: %s", e)
             return {} 
\ No newline at end of file
@@ -4,11 +4,30 @@ import os
 import json
 import logging
 import random
+import itertools
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Lightweight endpoint used for proxy health checks (empty 204 body)
+PROXY_CHECK_URL = "https://www.gstatic.com/generate_204"
+VALIDATION_WORKERS = 32
+
+_thread_local = threading.local()
+
+def _get_session():
+    """Get a requests session bound to the current thread"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        import requests
+        session = requests.Session()
+        _thread_local.session = session
+    return session
+
 class NetworkManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -16,34 +35,28 @@ class NetworkManager:
         self.dns_file = config.get("dns_file")
         self.proxies = self._load_proxies()
         self.dns_servers = self._load_dns()
-        self.current_proxy_index = 0
-        self.current_dns_index = 0
+        self._rotation_lock = threading.Lock()
+        self._proxy_iter = itertools.cycle(self.proxies)
+        self._dns_iter = itertools.cycle(self.dns_servers)
     
     def get_next_proxy(self) -> Dict[str, str]:
         """Get next proxy from the list"""
         if not self.proxies:
             raise ValueError("No proxies available")
             
-        proxy = self.proxies[self.current_proxy_index]
-        self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxies)
-        
-        return {
-            "http": f"http://{proxy['username']}:{proxy['password']}@{proxy['host']}:{proxy['port']}",
-            "https": f"http://{proxy['username']}:{proxy['password']}@{proxy['host']}:{proxy['port']}"
-        }
+        with self._rotation_lock:
+            return next(self._proxy_iter)
     
     def get_next_dns(self) -> List[str]:
         """Get next DNS server from the list"""
         if not self.dns_servers:
             raise ValueError("No DNS servers available")
             
-        dns = self.dns_servers[self.current_dns_index]
-        self.current_dns_index = (self.current_dns_index + 1) % len(self.dns_servers)
-        
-        return [dns]
+        with self._rotation_lock:
+            return [next(self._dns_iter)]
     
     def _load_proxies(self) -> List[Dict[str, str]]:
-        """Load proxies from file"""
+        """Load proxies from file as ready-to-use requests proxy mappings"""
         if not self.proxy_file or not os.path.exists(self.proxy_file):
             logger.warning("No proxy file specified or file does not exist")
             return []
@@ -54,15 +67,11 @@ class NetworkManager:
                 for line in f:
                     # Expected format: host:port:username:password
                     host, port, username, password = line.strip().split(':')
-                    proxies.append({
-                        "host": host,
-                        "port": port,
-                        "username": username,
-                        "password": password
-                    })
+                    url = f"http://{username}:{password}@{host}:{port}"
+                    proxies.append({"http": url, "https": url})
                 return proxies
         except Exception as e:
-            logger.error(f"Error loading proxies: {e}")
+            logger.error("Error loading proxies: %s", e)
             return []
     
     def _load_dns(self) -> List[str]:
@@ -75,32 +84,48 @@ class NetworkManager:
             with open(self.dns_file, 'r') as f:
                 return [line.strip() for line in f if line.strip()]
         except Exception as e:
-            logger.error(f"Error loading DNS servers: {e}")
+            logger.error("Error loading DNS servers: %s", e)
             return []
     
+    def validate_all(self) -> List[Dict[str, str]]:
+        """Validate all proxies and DNS servers in parallel, dropping failures"""
+        with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS) as executor:
+            proxy_results = list(executor.map(self.validate_proxy, self.proxies))
+            dns_results = list(executor.map(self.validate_dns, self.dns_servers))
+        
+        with self._rotation_lock:
+            self.proxies = [p for p, ok in zip(self.proxies, proxy_results) if ok]
+            self.dns_servers = [d for d, ok in zip(self.dns_servers, dns_results) if ok]
+            self._proxy_iter = itertools.cycle(self.proxies)
+            self._dns_iter = itertools.cycle(self.dns_servers)
+        
+        logger.info("Validated %s proxies and %s DNS servers", len(self.proxies), len(self.dns_servers))
+        return self.proxies
+    
     def validate_proxy(self, proxy: Dict[str, str]) -> bool:
         """Validate proxy connection"""
         try:
-            import requests
-            response = requests.get(
-                "https://earnapp.com",
+            response = _get_session().head(
+                PROXY_CHECK_URL,
                 proxies=proxy,
-                timeout=10
+                timeout=5
             )
-            return response.status_code == 200
+            return response.status_code in (200, 204)
         except Exception as e:
-            logger.warning(f"Proxy validation failed: {e}")
+            logger.warning("Proxy validation failed: %s", e)
             return False
     
     def validate_dns(self, dns: str) -> bool:
-        """Validate DNS server"""
+        """Validate DNS server by resolving through it"""
         try:
-            import socket
-            socket.setdefaulttimeout(5)
-            socket.gethostbyname("earnapp.com")
+            from dns.resolver import Resolver
+            resolver = Resolver(configure=False)
+            resolver.nameservers = [dns]
+            resolver.lifetime = 5
+            resolver.resolve("earnapp.com", "A")
             return True
         except Exception as e:
-            logger.warning(f"DNS validation failed: {e}")
+            logger.warning("DNS validation failed for %s: %s", dns, e)
             return False
     
     def setup_network_isolation(self, container_id: str) -> None:
@@ -125,10 +150,10 @@ class NetworkManager:
             # Set default route
             os.system(f"ip netns exec netns_{container_id} ip route add default via 10.0.0.1")
             
-            logger.info(f"Set up network isolation for container {container_id}")
+            logger.info("Set up network isolation for container %s", container_id)
             
         except Exception as e:
-            logger.error(f"Error setting up network isolation: {e}")
+            logger.error("Error setting up network isolation: %s", e)
             raise
     
     def cleanup_network_isolation(self, container_id: str) -> None:
@@ -140,10 +165,10 @@ class NetworkManager:
             # Remove network namespace
             os.system(f"ip netns delete netns_{container_id}")
             
-            logger.info(f"Cleaned up network isolation for container {container_id}")
+            logger.info("Cleaned up network isolation for container %s", container_id)
             
         except Exception as e:
-            logger.error(f"Error cleaning up network isolation: {e}")
+            logger.error("Error cleaning up network isolation: %s", e)
             # Don't raise the exception as this is cleanup code
             
     def setup(self):
@@ -158,19 +183,19 @@ class NetworkManager:
         try:
             # Enable BBR congestion control
             if self.config['tcp']['bbr']:
-                self._run_command("sysctl -w net.ipv4.tcp_congestion_control=bbr")
-                self._run_command("sysctl -w net.core.default_qdisc=fq")
+                self._run_command(["sysctl", "-w", "net.ipv4.tcp_congestion_control=bbr"])
+                self._run_command(["sysctl", "-w", "net.core.default_qdisc=fq"])
                 
             # Configure TCP window size
             window_size = self.config['tcp']['window_size']
-            self._run_command(f"sysctl -w net.core.rmem_max={window_size}")
-            self._run_command(f"sysctl -w net.core.wmem_max={window_size}")
-            self._run_command(f"sysctl -w net.ipv4.tcp_rmem='4096 87380 {window_size}'")
-            self._run_command(f"sysctl -w net.ipv4.tcp_wmem='4096 87380 {window_size}'")
+            self._run_command(["sysctl", "-w", f"net.core.rmem_max={window_size}"])
+            self._run_command(["sysctl", "-w", f"net.core.wmem_max={window_size}"])
+            self._run_command(["sysctl", "-w", f"net.ipv4.tcp_rmem=4096 87380 {window_size}"])
+            self._run_command(["sysctl", "-w", f"net.ipv4.tcp_wmem=4096 87380 {window_size}"])
             
             # Enable TCP Fast Open if configured
             if self.config['tcp']['fastopen']:
-                self._run_command("sysctl -w net.ipv4.tcp_fastopen=3")
+                self._run_command(["sysctl", "-w", "net.ipv4.tcp_fastopen=3"])
                 
             # Apply OS fingerprint
             self._apply_tcp_fingerprint()
@@ -178,7 +203,7 @@ class NetworkManager:
             logger.info("TCP optimizations applied successfully")
             
         except Exception as e:
-            logger.error(f"Error setting up TCP: {e}")
+            logger.error("Error setting up TCP: %s", e)
             raise
             
     def _setup_udp(self):
@@ -186,17 +211,17 @@ class NetworkManager:
         try:
             # Set UDP buffer size
             buffer_size = self.config['udp']['buffer_size']
-            self._run_command(f"sysctl -w net.core.rmem_max={buffer_size}")
-            self._run_command(f"sysctl -w net.core.wmem_max={buffer_size}")
+            self._run_command(["sysctl", "-w", f"net.core.rmem_max={buffer_size}"])
+            self._run_command(["sysctl", "-w", f"net.core.wmem_max={buffer_size}"])
             
             # Set MTU
             mtu = self.config['udp']['mtu']
-            self._run_command(f"ip link set dev eth0 mtu {mtu}")
+            self._run_command(["ip", "link", "set", "dev", "eth0", "mtu", str(mtu)])
             
             logger.info("UDP optimizations applied successfully")
             
         except Exception as e:
-            logger.error(f"Error setting up UDP: {e}")
+            logger.error("Error setting up UDP: %s", e)
             raise
             
     def _apply_tcp_fingerprint(self):
@@ -218,47 +243,47 @@ class NetworkManager:
         
         fp = fingerprints.get(self.config['tcp']['fingerprint'])
         if not fp:
-            logger.warning(f"Unknown fingerprint: {self.config['tcp']['fingerprint']}")
+            logger.warning("Unknown fingerprint: %s", self.config['tcp']['fingerprint'])
             return
             
         try:
-            self._run_command(f"iptables -t mangle -A POSTROUTING -j TTL --ttl-set {fp['ttl']}")
-            self._run_command(f"sysctl -w net.ipv4.tcp_timestamps={fp['timestamps']}")
-            self._run_command(f"ip route add local default dev lo table 100")
-            self._run_command(f"ip rule add fwmark 1 lookup 100")
+            self._run_command(["iptables", "-t", "mangle", "-A", "POSTROUTING", "-j", "TTL", "--ttl-set", str(fp['ttl'])])
+            self._run_command(["sysctl", "-w", f"net.ipv4.tcp_timestamps={fp['timestamps']}"])
+            self._run_command(["ip", "route", "add", "local", "default", "dev", "lo", "table", "100"])
+            self._run_command(["ip", "rule", "add", "fwmark", "1", "lookup", "100"])
             
-            logger.info(f"Applied TCP fingerprint: {self.config['tcp']['fingerprint']}")
+            logger.info("Applied TCP fingerprint: %s", self.config['tcp']['fingerprint'])
             
         except Exception as e:
-            logger.error(f"Error applying TCP fingerprint: {e}")
+            logger.error("Error applying TCP fingerprint: %s", e)
             raise
             
     def cleanup(self):
         """Cleanup network configurations"""
         try:
             # Remove custom iptables rules
-            self._run_command("iptables -t mangle -F")
+            self._run_command(["iptables", "-t", "mangle", "-F"])
             # Remove custom routing rules
-            self._run_command("ip rule del fwmark 1 lookup 100")
-            self._run_command("ip route del local default dev lo table 100")
+            self._run_command(["ip", "rule", "del", "fwmark", "1", "lookup", "100"])
+            self._run_command(["ip", "route", "del", "local", "default", "dev", "lo", "table", "100"])
             
             logger.info("Network cleanup completed")
             
         except Exception as e:
-            logger.error(f"Error during network cleanup: {e}")
+            logger.error("Error during network cleanup: %s", e)
             raise
             
-    def _run_command(self, command: str) -> str:
-        """Execute shell command and return output"""
+    def _run_command(self, command: List[str]) -> str:
+        """Execute command argv and return output"""
         try:
             result = subprocess.run(
-                command.split(),
+                command,
                 capture_output=True,
                 text=True,
                 check=True
             )
             return result.stdout.strip()
         except subprocess.CalledProcessError as e:
-            logger.error(f"Command failed: {command}")
-            logger.error(f"Error output: {e.stderr}")
+            logger.error("Command failed: %s", " ".join(command))
+            logger.error("Error output: %s", e.stderr)
             raise 
\ No newline at end of file
@@ -2,83 +2,126 @@
 
 import logging
 import random
+import itertools
+import threading
 import socket
-import json
 import subprocess
 import os
+import fcntl
+import orjson
 import requests
-from typing import Dict, Any, List
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+VALIDATION_WORKERS = 32
+
+@dataclass
+class Tunnel:
+    """Runtime state of one TunSocks tunnel"""
+    __slots__ = ("tun_name", "table_id", "process", "proxy")
+    
+    tun_name: str
+    table_id: int
+    process: subprocess.Popen
+    proxy: Dict[str, str]
+
 class ProxyHandler:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.active_tunnels = {}
+        self.active_tunnels: Dict[str, Tunnel] = {}
         self.proxies = []
-        self.current_index = 0
+        self._cycle = iter(())
+        self._rotation_lock = threading.Lock()
+        self._validated = {}
+        self._table_ids = itertools.count(1000)
+        self._registered_tables = set()
+        self._validator_session = self._setup_validator_session()
         self._load_proxies()
         
     def setup_proxy(self, instance_id: str, proxy_config: Dict[str, str]) -> bool:
         """Setup TunSocks proxy tunnel for an instance"""
+        return self.setup_proxies([(instance_id, proxy_config)])
+        
+    def setup_proxies(self, items: List[Tuple[str, Dict[str, str]]]) -> bool:
+        """Setup TunSocks proxy tunnels for several instances in one batch"""
         try:
-            # Generate unique TUN interface name
-            tun_name = f"tun{instance_id[-4:]}"
+            # Generate unique TUN interface names
+            tun_names = [f"tun{instance_id[-4:]}" for instance_id, _ in items]
             
-            # Create TUN device
-            self._create_tun_device(tun_name)
+            # Create TUN devices and configure routing for all tunnels at once
+            table_ids = self._setup_routing(tun_names)
             
-            # Configure routing
-            self._setup_routing(tun_name)
-            
-            # Start TunSocks process
-            process = self._start_tunsocks(tun_name, proxy_config)
-            
-            self.active_tunnels[instance_id] = {
-                "tun_name": tun_name,
-                "process": process,
-                "proxy": proxy_config
-            }
+            # Start TunSocks processes
+            for (instance_id, proxy_config), tun_name, table_id in zip(items, tun_names, table_ids):
+                process = self._start_tunsocks(tun_name, proxy_config)
+                
+                self.active_tunnels[instance_id] = Tunnel(tun_name, table_id, process, proxy_config)
             
             return True
             
         except Exception as e:
-            self.logger.error(f"Error setting up TunSocks: {e}")
+            self.logger.error("Error setting up TunSocks: %s", e)
             return False
             
-    def _create_tun_device(self, tun_name: str):
-        """Create and configure TUN device"""
-        commands = [
-            f"ip tuntap add dev {tun_name} mode tun user root",
-            f"ip link set dev {tun_name} up",
-            f"ip addr add 10.{random.randint(0,255)}.{random.randint(0,255)}.1/24 dev {tun_name}"
+    def _create_tun_device(self, tun_name: str) -> List[str]:
+        """Build ip batch commands to create and configure a TUN device"""
+        return [
+            f"tuntap add dev {tun_name} mode tun user root",
+            f"link set dev {tun_name} up",
+            f"addr add {self._random_subnet()}.1/24 dev {tun_name}"
         ]
-        
-        for cmd in commands:
-            subprocess.run(cmd.split(), check=True)
             
-    def _setup_routing(self, tun_name: str):
-        """Configure routing for TunSocks"""
-        table_id = random.randint(100, 200)
+    @staticmethod
+    def _random_subnet() -> str:
+        """Pick a random 10.x.y /24 prefix"""
+        x, y = os.urandom(2)
+        return f"10.{x}.{y}"
+            
+    def _setup_routing(self, tun_names: List[str]) -> List[int]:
+        """Create TUN devices and routing using one ip batch and one iptables-restore"""
+        table_ids = [next(self._table_ids) for _ in tun_names]
+        ip_batch = []
+        mangle_rules = []
         
-        commands = [
+        # TUN devices must exist before routes can point at them
+        for tun_name in tun_names:
+            ip_batch.extend(self._create_tun_device(tun_name))
+        
+        for tun_name, table_id in zip(tun_names, table_ids):
             # Create routing table
-            f"echo '{table_id} {tun_name}' >> /etc/iproute2/rt_tables",
-            
-            # Add routes
-            f"ip route add default dev {tun_name} table {table_id}",
+            if table_id not in self._registered_tables:
+                self._register_routing_table(table_id, tun_name)
             
-            # Add policy routing
-            f"ip rule add fwmark {table_id} table {table_id}",
+            # Add routes and policy routing
+            ip_batch.append(f"route add default dev {tun_name} table {table_id}")
+            ip_batch.append(f"rule add fwmark {table_id} table {table_id}")
             
-            # Configure iptables for marking packets
-            f"iptables -t mangle -A OUTPUT -m owner --uid-owner tunsocks -j MARK --set-mark {table_id}"
-        ]
+            # Mark packets for the tunnel's table
+            mangle_rules.append(f"-A OUTPUT -m owner --uid-owner tunsocks -j MARK --set-mark {table_id}")
         
-        for cmd in commands:
-            subprocess.run(cmd.split(), check=True)
+        subprocess.run(["ip", "-batch", "-"], input="\n".join(ip_batch) + "\n", text=True, check=True)
+        
+        iptables_blob = "*mangle\n" + "\n".join(mangle_rules) + "\nCOMMIT\n"
+        subprocess.run(["iptables-restore", "--noflush"], input=iptables_blob, text=True, check=True)
+        
+        return table_ids
+            
+    def _register_routing_table(self, table_id: int, tun_name: str):
+        """Record a named routing table in /etc/iproute2/rt_tables"""
+        with open("/etc/iproute2/rt_tables", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(f"{table_id} {tun_name}\n")
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self._registered_tables.add(table_id)
             
     def _start_tunsocks(self, tun_name: str, proxy_config: Dict[str, str]) -> subprocess.Popen:
         """Start TunSocks process"""
@@ -86,7 +129,7 @@ class ProxyHandler:
             "interface": {
                 "name": tun_name,
                 "mtu": self.config["network"]["mtu"],
-                "ipv4": f"10.{random.randint(0,255)}.{random.randint(0,255)}.1",
+                "ipv4": f"{self._random_subnet()}.1",
                 "netmask": "255.255.255.0"
             },
             "proxy": {
@@ -109,15 +152,19 @@ class ProxyHandler:
                 ]
             },
             "advanced": {
-                "tcp_keepalive": true,
+                "tcp_keepalive": True,
                 "tcp_keepalive_interval": 30,
                 "udp_timeout": 60,
-                "mss_fix": true
+                "mss_fix": True
             }
         }
         
         config_path = Path(f"/tmp/tunsocks_{tun_name}.json")
-        config_path.write_text(json.dumps(config))
+        fd = os.open(config_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, orjson.dumps(config))
+        finally:
+            os.close(fd)
         
         return subprocess.Popen([
             "tunsocks",
@@ -137,14 +184,14 @@ class ProxyHandler:
         
         try:
             # Stop TunSocks process
-            tunnel["process"].terminate()
-            tunnel["process"].wait(timeout=5)
+            tunnel.process.terminate()
+            tunnel.process.wait(timeout=5)
             
             # Remove TUN device
-            subprocess.run(["ip", "tuntap", "del", "dev", tunnel["tun_name"], "mode", "tun"])
+            subprocess.run(["ip", "tuntap", "del", "dev", tunnel.tun_name, "mode", "tun"])
             
             # Clean up routing
-            table_id = int(tunnel["tun_name"][3:])
+            table_id = tunnel.table_id
             subprocess.run(["ip", "rule", "del", "fwmark", str(table_id)])
             
             # Remove iptables rules
@@ -155,89 +202,120 @@ class ProxyHandler:
             ])
             
             # Clean up config
-            config_path = Path(f"/tmp/tunsocks_{tunnel['tun_name']}.json")
+            config_path = Path(f"/tmp/tunsocks_{tunnel.tun_name}.json")
             if config_path.exists():
                 config_path.unlink()
                 
             del self.active_tunnels[instance_id]
             
         except Exception as e:
-            self.logger.error(f"Error cleaning up tunnel: {e}")
+            self.logger.error("Error cleaning up tunnel: %s", e)
             
     def get_tunnel_info(self, instance_id: str) -> Dict[str, Any]:
         """Get tunnel information"""
-        return self.active_tunnels.get(instance_id, {})
+        tunnel = self.active_tunnels.get(instance_id)
+        if tunnel is None:
+            return {}
+        return {slot: getattr(tunnel, slot) for slot in Tunnel.__slots__}
     
     def get_next_proxy(self) -> str:
-        """Get next proxy from the list"""
+        """Get next working proxy from the list, validating each on first use"""
         try:
-            if not self.proxies:
-                raise ValueError("No proxies available")
-            
-            proxy = self.proxies[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.proxies)
-            
-            return proxy
+            while True:
+                with self._rotation_lock:
+                    proxy = next(self._cycle, None)
+                if proxy is None:
+                    raise ValueError("No proxies available")
+                
+                if proxy not in self._validated:
+                    self._validated[proxy] = self.validate_proxy(proxy)
+                    
+                if self._validated[proxy]:
+                    return proxy
+                    
+                logger.warning("Invalid proxy: %s", proxy)
+                with self._rotation_lock:
+                    if proxy in self.proxies:
+                        self.proxies.remove(proxy)
+                        self._cycle = itertools.cycle(self.proxies)
             
         except Exception as e:
-            logger.error(f"Error getting next proxy: {e}")
+            logger.error("Error getting next proxy: %s", e)
             raise
     
+    def _setup_validator_session(self) -> requests.Session:
+        """Set up a pooled session shared by proxy validation workers"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
     def validate_proxy(self, proxy: str) -> bool:
         """Validate proxy by testing connection"""
         try:
+            # Cheap TCP probe first so dead proxies skip the HTTP round-trip
+            host, port = proxy.rsplit("@", 1)[-1].rsplit(":", 1)
+            with socket.create_connection((host, int(port)), timeout=1.5):
+                pass
+            
             proxies = {
                 "http": f"http://{proxy}",
                 "https": f"http://{proxy}"
             }
             
-            response = requests.get(
-                "https://earnapp.com",
+            response = self._validator_session.head(
+                "https://earnapp.com/favicon.ico",
                 proxies=proxies,
-                timeout=10
+                allow_redirects=False,
+                timeout=(3, 5)
             )
             
-            return response.status_code == 200
+            return 200 <= response.status_code < 400
             
         except Exception as e:
-            logger.warning(f"Proxy validation failed for {proxy}: {e}")
+            logger.warning("Proxy validation failed for %s: %s", proxy, e)
             return False
     
+    def validate_all(self) -> None:
+        """Eagerly validate all unchecked proxies concurrently and drop invalid ones"""
+        unchecked = [proxy for proxy in self.proxies if proxy not in self._validated]
+        with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS) as executor:
+            self._validated.update(zip(unchecked, executor.map(self.validate_proxy, unchecked)))
+        
+        with self._rotation_lock:
+            self.proxies = [proxy for proxy in self.proxies if self._validated[proxy]]
+            self._cycle = itertools.cycle(self.proxies)
+        logger.info("Validated proxies, %s remain", len(self.proxies))
+    
     def _load_proxies(self) -> None:
-        """Load and validate proxies from file"""
+        """Load proxies from file; each is validated on first use"""
         try:
             proxy_file = Path(self.config["proxy_file"])
             if not proxy_file.exists():
                 raise FileNotFoundError(f"Proxy file not found: {proxy_file}")
             
             with open(proxy_file) as f:
-                raw_proxies = [line.strip() for line in f if line.strip()]
-            
-            # Validate proxies
-            valid_proxies = []
-            for proxy in raw_proxies:
-                if self.validate_proxy(proxy):
-                    valid_proxies.append(proxy)
-                    logger.info(f"Valid proxy found: {proxy}")
-                else:
-                    logger.warning(f"Invalid proxy: {proxy}")
+                proxies = [line.strip() for line in f if line.strip()]
             
-            if not valid_proxies:
-                raise ValueError("No valid proxies found in file")
+            if not proxies:
+                raise ValueError("No proxies found in file")
             
-            self.proxies = valid_proxies
-            logger.info(f"Loaded {len(valid_proxies)} valid proxies")
+            self.proxies = proxies
+            self._cycle = itertools.cycle(self.proxies)
+            logger.info("Loaded %s proxies", len(proxies))
             
         except Exception as e:
-            logger.error(f"Error loading proxies: {e}")
+            logger.error("Error loading proxies: %s", e)
             raise
     
     def rotate_proxies(self) -> None:
         """Rotate proxy list"""
         try:
-            random.shuffle(self.proxies)
-            self.current_index = 0
+            with self._rotation_lock:
+                random.shuffle(self.proxies)
+                self._cycle = itertools.cycle(self.proxies)
             logger.info("Proxy list rotated")
         except Exception as e:
-            logger.error(f"Error rotating proxies: {e}")
+            logger.error("Error rotating proxies: %s", e)
             raise 
\ No newline at end of file
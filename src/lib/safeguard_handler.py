@@ -1,65 +1,128 @@
 #!/usr/bin/env python3
 
-import json
+import os
 import logging
 import re
+import time
+import functools
+import orjson
 from pathlib import Path
-from typing import Dict, Any, Optional
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from typing import Dict, Any, Optional, Tuple
+
+BLOCKED_DOMAINS = frozenset({
+    'safeguard.earnapp.com',
+    'verify.earnapp.com',
+    'check.earnapp.com'
+})
+
+def _is_blocked_domain(hostname: str) -> bool:
+    """Check a hostname and each of its parent domains against the block set"""
+    while True:
+        if hostname in BLOCKED_DOMAINS:
+            return True
+        dot = hostname.find('.')
+        if dot < 0:
+            return False
+        hostname = hostname[dot + 1:]
+
+_HOSTS_BLOCK_MARKER = "\n# AetherNode safeguard blocking\n"
+_HOSTS_BLOCK_RE = re.compile(r"\n# AetherNode safeguard blocking\n(?:127\.0\.0\.1 \S+\n)+")
+
+# Upstream statuses worth retrying with backoff
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+CONFIG_PATH = Path("/etc/aethernode/safeguard.json")
+DEFAULT_CONFIG = {
+    "request_patterns": [],
+    "headers": {},
+    "rotation_interval": 3600,
+    "max_retries": 3,
+    "retry_delay": 5
+}
 
 class SafeguardHandler:
+    # (parsed config, compiled patterns) shared by all handlers, keyed by (path, mtime)
+    _config_cache: Dict[Tuple[str, float], Tuple[Dict[str, Any], tuple]] = {}
+    _last_good_config: Optional[Tuple[Dict[str, Any], tuple]] = None
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.config = self._load_config()
-        self.session = self._setup_session()
+        self.config, (self._pattern_regex, self._pattern_responses) = self._load_config()
+        self._session = None
+        
+    @property
+    def session(self):
+        """HTTP session, created on first proxied request"""
+        if self._session is None:
+            session_key = (self.config['max_retries'], tuple(sorted(self.config['headers'].items())))
+            self._session = type(self)._setup_session(session_key)
+        return self._session
+        
+    def _load_config(self) -> Tuple[Dict[str, Any], tuple]:
+        """Load safeguard configuration and its compiled patterns, reused while the file is unchanged"""
+        cls = type(self)
+        fallback = cls._last_good_config or (DEFAULT_CONFIG, self._compile_patterns(DEFAULT_CONFIG))
         
-    def _load_config(self) -> Dict[str, Any]:
-        """Load safeguard configuration"""
         try:
-            config_path = Path("/etc/aethernode/safeguard.json")
-            with open(config_path, 'r') as f:
-                return json.load(f)
+            cache_key = (str(CONFIG_PATH), os.stat(CONFIG_PATH).st_mtime)
+        except OSError as e:
+            self.logger.error(f"Failed to load safeguard config: {e}")
+            return fallback
+            
+        cached = cls._config_cache.get(cache_key)
+        if cached is not None:
+            return cached
+            
+        try:
+            with open(CONFIG_PATH, 'rb') as f:
+                config = orjson.loads(f.read())
+            loaded = (config, self._compile_patterns(config))
         except Exception as e:
             self.logger.error(f"Failed to load safeguard config: {e}")
-            return {
-                "request_patterns": [],
-                "headers": {},
-                "rotation_interval": 3600,
-                "max_retries": 3,
-                "retry_delay": 5
-            }
+            return fallback
             
-    def _setup_session(self) -> requests.Session:
-        """Set up requests session with retry strategy"""
-        session = requests.Session()
+        cls._config_cache = {cache_key: loaded}
+        cls._last_good_config = loaded
+        return loaded
+            
+    @staticmethod
+    def _compile_patterns(config: Dict[str, Any]) -> tuple:
+        """Union all safeguard URL patterns into (regex, group -> response), compiled once per config load"""
+        patterns = config['request_patterns']
+        responses = {f"p{i}": pattern['response'] for i, pattern in enumerate(patterns)}
+        regex = re.compile(
+            "|".join(f"(?P<p{i}>{pattern['url_pattern']})" for i, pattern in enumerate(patterns))
+        ) if patterns else None
+        return regex, responses
+            
+    @classmethod
+    @functools.lru_cache(maxsize=8)
+    def _setup_session(cls, session_key: Tuple[int, Tuple[Tuple[str, str], ...]]):
+        """Set up pooled HTTP/2 client shared by all handlers with the same settings"""
+        import httpx
         
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=self.config['max_retries'],
-            backoff_factor=self.config['retry_delay'],
-            status_forcelist=[429, 500, 502, 503, 504]
+        max_retries, headers = session_key
+        # With an explicit transport httpx ignores client-level limits/http2, so they go on the transport
+        return httpx.Client(
+            headers=dict(headers),
+            timeout=10.0,
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        
-        # Set default headers
-        session.headers.update(self.config['headers'])
-        
-        return session
-        
     def handle_request(self, url: str, method: str = 'GET', 
                       data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Handle incoming request and return appropriate response"""
         try:
             # Check if URL matches any safeguard patterns
-            for pattern in self.config['request_patterns']:
-                if re.match(pattern['url_pattern'], url):
-                    self.logger.info(f"Blocked safeguard request to: {url}")
-                    return pattern['response']
+            match = self._pattern_regex.match(url) if self._pattern_regex else None
+            if match:
+                self.logger.info(f"Blocked safeguard request to: {url}")
+                return self._pattern_responses[match.lastgroup]
                     
             # If no pattern matches, proxy the request
             response = self._proxy_request(url, method, data)
@@ -76,22 +139,36 @@ class SafeguardHandler:
                       data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Proxy request to actual endpoint with modifications"""
         try:
-            # Modify request headers
-            headers = self.session.headers.copy()
-            headers['X-Forwarded-For'] = self._generate_ip()
-            
-            # Make request
-            response = self.session.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=data,
-                timeout=10
-            )
+            max_retries = self.config['max_retries']
+            for attempt in range(max_retries + 1):
+                started = time.monotonic()
+                # Make request; the client merges this over its default headers
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    headers={'X-Forwarded-For': self._generate_ip()},
+                    json=data
+                )
+                if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    break
+                # Backoff counts from when the attempt started, so a slow response
+                # already pays for part (or all) of the wait
+                deficit = started + self.config['retry_delay'] * (2 ** attempt) - time.monotonic()
+                if deficit > 0:
+                    time.sleep(deficit)
+            
+            # Only parse bodies that are actually JSON
+            content = response.content
+            if not content:
+                body = {}
+            elif 'json' in response.headers.get('content-type', ''):
+                body = orjson.loads(content)
+            else:
+                body = response.text
             
             return {
                 'status': response.status_code,
-                'body': response.json() if response.content else {}
+                'body': body
             }
             
         except Exception as e:
@@ -103,19 +180,14 @@ class SafeguardHandler:
             
     def _generate_ip(self) -> str:
         """Generate a random IP address"""
-        import random
-        return f"{random.randint(1,255)}.{random.randint(0,255)}." \
-               f"{random.randint(0,255)}.{random.randint(1,255)}"
+        a, b, c, d = os.urandom(4)
+        return f"{a or 1}.{b}.{c}.{d or 1}"
                
     def intercept_dns(self, hostname: str) -> Optional[str]:
-        """Intercept DNS requests for safeguard domains"""
-        blocked_domains = [
-            'safeguard.earnapp.com',
-            'verify.earnapp.com',
-            'check.earnapp.com'
-        ]
+        """Intercept DNS requests for safeguard domains and their subdomains"""
+        hostname = hostname.lower().rstrip('.')
         
-        if any(domain in hostname.lower() for domain in blocked_domains):
+        if _is_blocked_domain(hostname):
             self.logger.info(f"Blocked DNS request for: {hostname}")
             return '127.0.0.1'
             
@@ -127,24 +199,32 @@ class SafeguardHandler:
             import iptc
             
             # Create chain for safeguard rules
-            chain = iptc.Chain(iptc.Table(iptc.Table.FILTER), "SAFEGUARD")
-            if chain not in iptc.Table(iptc.Table.FILTER).chains:
-                iptc.Table(iptc.Table.FILTER).create_chain("SAFEGUARD")
+            table = iptc.Table(iptc.Table.FILTER)
+            table.autocommit = False
+            try:
+                if not table.is_chain("SAFEGUARD"):
+                    table.create_chain("SAFEGUARD")
+                chain = iptc.Chain(table, "SAFEGUARD")
+                    
+                # Clear existing rules
+                chain.flush()
                 
-            # Clear existing rules
-            chain.flush()
-            
-            # Add rules to block safeguard domains
-            blocked_ips = [
-                '34.102.136.180',  # Example safeguard IP
-                '35.186.224.25',   # Example verification IP
-            ]
-            
-            for ip in blocked_ips:
-                rule = iptc.Rule()
-                rule.target = iptc.Target(rule, "DROP")
-                rule.src = ip
-                chain.insert_rule(rule)
+                # Add rules to block safeguard domains
+                blocked_ips = [
+                    '34.102.136.180',  # Example safeguard IP
+                    '35.186.224.25',   # Example verification IP
+                ]
+                
+                for ip in blocked_ips:
+                    rule = iptc.Rule()
+                    rule.target = iptc.Target(rule, "DROP")
+                    rule.src = ip
+                    chain.insert_rule(rule)
+                    
+                # Apply all changes in a single kernel commit
+                table.commit()
+            finally:
+                table.autocommit = True
                 
             self.logger.info("Iptables rules configured for safeguard blocking")
             
@@ -154,15 +234,19 @@ class SafeguardHandler:
     def modify_hosts_file(self):
         """Modify hosts file to block safeguard domains"""
         try:
-            hosts_entries = [
-                "127.0.0.1 safeguard.earnapp.com",
-                "127.0.0.1 verify.earnapp.com",
-                "127.0.0.1 check.earnapp.com"
-            ]
-            
-            with open('/etc/hosts', 'a') as f:
-                f.write("\n# AetherNode safeguard blocking\n")
-                f.write("\n".join(hosts_entries) + "\n")
+            hosts_path = Path('/etc/hosts')
+            hosts_entries = [f"127.0.0.1 {domain}" for domain in sorted(BLOCKED_DOMAINS)]
+            
+            # Rewrite in place: inside Docker /etc/hosts is a bind mount and can't be renamed over
+            with open(hosts_path, 'r+') as f:
+                # Drop any block left by a previous run, then append a fresh one
+                data = _HOSTS_BLOCK_RE.sub("", f.read())
+                if data and not data.endswith("\n"):
+                    data += "\n"
+                data += _HOSTS_BLOCK_MARKER + "\n".join(hosts_entries) + "\n"
+                f.seek(0)
+                f.write(data)
+                f.truncate()
                 
             self.logger.info("Hosts file updated for safeguard blocking")
             
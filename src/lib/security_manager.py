@@ -1,25 +1,266 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import logging
+import functools
+import string
 import subprocess
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import json
+import hashlib
+
+_SECCOMP_PROFILE = {
+    "defaultAction": "SCMP_ACT_ERRNO",
+    "architectures": ["SCMP_ARCH_X86_64"],
+    "syscalls": [
+        {
+            "names": [
+                "accept", "bind", "connect", "socket",
+                "read", "write", "close", "fstat",
+                "lseek", "mmap", "mprotect", "munmap",
+                "brk", "rt_sigaction", "rt_sigprocmask",
+                "rt_sigreturn", "ioctl", "access", "pipe",
+                "select", "mremap", "sched_yield", "msync",
+                "mincore", "madvise", "shmget", "shmat",
+                "shmctl", "dup", "dup2", "pause", "nanosleep",
+                "getitimer", "alarm", "setitimer", "getpid",
+                "sendfile", "socket", "connect", "accept",
+                "sendto", "recvfrom", "sendmsg", "recvmsg",
+                "shutdown", "bind", "listen", "getsockname",
+                "getpeername", "socketpair", "setsockopt",
+                "getsockopt", "clone", "fork", "vfork",
+                "execve", "exit", "wait4", "kill", "uname",
+                "semget", "semop", "semctl", "shmdt",
+                "msgget", "msgsnd", "msgrcv", "msgctl",
+                "fcntl", "flock", "fsync", "fdatasync",
+                "truncate", "ftruncate", "getcwd", "chdir",
+                "fchdir", "rename", "mkdir", "rmdir",
+                "creat", "link", "unlink", "symlink",
+                "readlink", "chmod", "fchmod", "chown",
+                "fchown", "lchown", "umask", "gettimeofday",
+                "getrlimit", "getrusage", "sysinfo",
+                "times", "ptrace", "getuid", "syslog",
+                "getgid", "setuid", "setgid", "geteuid",
+                "getegid", "setpgid", "getppid", "getpgrp",
+                "setsid", "setreuid", "setregid",
+                "getgroups", "setgroups", "setresuid",
+                "getresuid", "setresgid", "getresgid",
+                "getpgid", "setfsuid", "setfsgid", "getsid",
+                "capget", "capset", "rt_sigpending",
+                "rt_sigtimedwait", "rt_sigqueueinfo",
+                "rt_sigsuspend", "sigaltstack",
+                "utime", "mknod", "uselib", "personality",
+                "ustat", "statfs", "fstatfs", "sysfs",
+                "getpriority", "setpriority", "sched_setparam",
+                "sched_getparam", "sched_setscheduler",
+                "sched_getscheduler", "sched_get_priority_max",
+                "sched_get_priority_min", "sched_rr_get_interval",
+                "mlock", "munlock", "mlockall", "munlockall",
+                "vhangup", "modify_ldt", "pivot_root",
+                "_sysctl", "prctl", "arch_prctl", "adjtimex",
+                "setrlimit", "chroot", "sync", "acct",
+                "mount", "umount2", "swapon", "swapoff",
+                "reboot", "sethostname", "setdomainname",
+                "iopl", "ioperm", "create_module",
+                "init_module", "delete_module", "get_kernel_syms",
+                "query_module", "quotactl", "nfsservctl",
+                "getpmsg", "putpmsg", "afs_syscall",
+                "tuxcall", "security", "gettid",
+                "readahead", "setxattr", "lsetxattr",
+                "fsetxattr", "getxattr", "lgetxattr",
+                "fgetxattr", "listxattr", "llistxattr",
+                "flistxattr", "removexattr", "lremovexattr",
+                "fremovexattr", "tkill", "time",
+                "futex", "sched_setaffinity",
+                "sched_getaffinity", "set_thread_area",
+                "io_setup", "io_destroy", "io_getevents",
+                "io_submit", "io_cancel", "get_thread_area",
+                "lookup_dcookie", "epoll_create",
+                "epoll_ctl_old", "epoll_wait_old",
+                "remap_file_pages", "getdents64",
+                "set_tid_address", "restart_syscall",
+                "semtimedop", "fadvise64", "timer_create",
+                "timer_settime", "timer_gettime",
+                "timer_getoverrun", "timer_delete",
+                "clock_settime", "clock_gettime",
+                "clock_getres", "clock_nanosleep",
+                "exit_group", "epoll_wait", "epoll_ctl",
+                "tgkill", "utimes", "vserver",
+                "mbind", "set_mempolicy", "get_mempolicy",
+                "mq_open", "mq_unlink", "mq_timedsend",
+                "mq_timedreceive", "mq_notify",
+                "mq_getsetattr", "kexec_load",
+                "waitid", "add_key", "request_key",
+                "keyctl", "ioprio_set", "ioprio_get",
+                "inotify_init", "inotify_add_watch",
+                "inotify_rm_watch", "migrate_pages",
+                "openat", "mkdirat", "mknodat",
+                "fchownat", "futimesat", "newfstatat",
+                "unlinkat", "renameat", "linkat",
+                "symlinkat", "readlinkat", "fchmodat",
+                "faccessat", "pselect6", "ppoll",
+                "unshare", "set_robust_list",
+                "get_robust_list", "splice", "tee",
+                "sync_file_range", "vmsplice",
+                "move_pages", "utimensat", "epoll_pwait",
+                "signalfd", "timerfd_create",
+                "eventfd", "fallocate", "timerfd_settime",
+                "timerfd_gettime", "accept4",
+                "signalfd4", "eventfd2", "epoll_create1",
+                "dup3", "pipe2", "inotify_init1",
+                "preadv", "pwritev", "rt_tgsigqueueinfo",
+                "perf_event_open", "recvmmsg",
+                "fanotify_init", "fanotify_mark",
+                "prlimit64", "name_to_handle_at",
+                "open_by_handle_at", "clock_adjtime",
+                "syncfs", "sendmmsg", "setns",
+                "getcpu", "process_vm_readv",
+                "process_vm_writev", "kcmp",
+                "finit_module", "sched_setattr",
+                "sched_getattr", "renameat2",
+                "seccomp", "getrandom", "memfd_create",
+                "kexec_file_load", "bpf", "execveat",
+                "userfaultfd", "membarrier", "mlock2",
+                "copy_file_range", "preadv2", "pwritev2",
+                "pkey_mprotect", "pkey_alloc",
+                "pkey_free", "statx",
+                "io_pgetevents", "rseq"
+            ],
+            "action": "SCMP_ACT_ALLOW"
+        }
+    ]
+}
+
+_SECCOMP_PROFILE_BYTES = json.dumps(_SECCOMP_PROFILE, separators=(',', ':')).encode()
+_SECCOMP_SHA = hashlib.blake2b(_SECCOMP_PROFILE_BYTES, digest_size=16).hexdigest()
+SECCOMP_SHARED_PATH = Path(f"/etc/docker/seccomp/shared-{_SECCOMP_SHA}.json")
+
+_APPARMOR_TMPL = string.Template("""#include <tunables/global>
+
+profile $name flags=(attach_disconnected,mediate_deleted) {
+    #include <abstractions/base>
+    #include <abstractions/nameservice>
+    
+    network,
+    capability net_admin,
+    capability net_raw,
+    
+    deny @{PROC}/* w,   # deny write for all files directly in /proc
+    deny @{PROC}/{[^1-9]*,sys/kernel/shm*} rw,
+    deny @{PROC}/sysrq-trigger rwklx,
+    deny @{PROC}/mem rwklx,
+    deny @{PROC}/kmem rwklx,
+    deny @{PROC}/kcore rwklx,
+    deny mount,
+    deny /sys/[^f]*/** wklx,
+    deny /sys/f[^s]*/** wklx,
+    deny /sys/fs/[^c]*/** wklx,
+    deny /sys/fs/c[^g]*/** wklx,
+    deny /sys/fs/cg[^r]*/** wklx,
+    deny /sys/firmware/efi/efivars/** rwklx,
+    deny /sys/kernel/security/** rwklx,
+    
+    # Allow limited reads from /proc for own pid
+    owner @{PROC}/@{pid}/stat r,
+    owner @{PROC}/@{pid}/cmdline r,
+    owner @{PROC}/@{pid}/fd/ r,
+    
+    /etc/earnapp/** r,
+    owner /tmp/** rw,
+    owner /var/tmp/** rw,
+}
+""")
+
+STAMP_DIR = Path("/run/yashaoxen")
+
+_RESOLV_BYTES = b"""
+nameserver 1.1.1.1
+nameserver 8.8.8.8
+options edns0
+options trust-ad
+"""
+
+_UNITS = {
+    '': 1, 'B': 1,
+    'K': 1 << 10, 'KB': 1 << 10, 'KI': 1 << 10, 'KIB': 1 << 10,
+    'M': 1 << 20, 'MB': 1 << 20, 'MI': 1 << 20, 'MIB': 1 << 20,
+    'G': 1 << 30, 'GB': 1 << 30, 'GI': 1 << 30, 'GIB': 1 << 30,
+}
+_MEM_RE = re.compile(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?I?B?)\s*')
+
+@functools.lru_cache(maxsize=64)
+def _parse_memory_limit(limit: str) -> int:
+    """Convert memory limit string (e.g. 1G, 1.5G, 512MB, 1Gi) to bytes"""
+    m = _MEM_RE.fullmatch(limit.upper())
+    if not m or m.group(2) not in _UNITS:
+        raise ValueError(f"Invalid memory limit: {limit}")
+    return int(round(float(m.group(1)) * _UNITS[m.group(2)]))
+
+def _write_bytes(path, data: bytes) -> None:
+    """Write data to path with a single unbuffered write"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
 
 class SecurityManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # container name -> (cgroup inode, memory.limit_in_bytes fd, cpu.shares fd)
+        self._cg_fds: Dict[str, Tuple[int, int, int]] = {}
+        
+    @staticmethod
+    def _close_fds(fds) -> None:
+        """Close file descriptors, ignoring ones that are already gone"""
+        for fd in fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        
+    def close(self) -> None:
+        """Close cached cgroup control file descriptors"""
+        for _, *fds in self._cg_fds.values():
+            self._close_fds(fds)
+        self._cg_fds.clear()
+        
+    def __del__(self):
+        self.close()
         
     def setup_container_isolation(self, container_name: str, config: Dict[str, Any]) -> None:
         """Set up container isolation with security measures"""
         try:
+            # Skip everything if this container was already set up with the same config
+            stamp_path = STAMP_DIR / f"{container_name}.stamp"
+            cfg_hash = hashlib.blake2b(
+                json.dumps(config, sort_keys=True, default=str).encode() + _SECCOMP_SHA.encode(),
+                digest_size=16
+            ).hexdigest()
+            # The stamp only counts while the netns and cgroup it was written for still exist
+            identity = self._isolation_identity(container_name)
+            try:
+                if identity and stamp_path.read_text() == f"{cfg_hash}:{identity}":
+                    self.logger.info(f"Container isolation already configured for {container_name}")
+                    return
+            except FileNotFoundError:
+                pass
+            
             # Create dedicated network namespace
             namespace = f"netns_{container_name}"
-            self._create_network_namespace(namespace)
+            ip_cmds, ns_cmds = [], []
+            ipt_rules = {'filter': [], 'nat': []}
+            self._create_network_namespace(namespace, ip_cmds, ns_cmds)
             
             # Set up network isolation
-            self._configure_network_isolation(namespace, config)
+            self._configure_network_isolation(namespace, config, ns_cmds, ipt_rules)
+            
+            # Apply network changes in one ip batch per namespace and one iptables-restore
+            self._ip_batch(ip_cmds)
+            self._ip_batch(ns_cmds, namespace)
+            self._iptables_restore(ipt_rules)
             
             # Configure seccomp profile
             self._setup_seccomp_profile(container_name)
@@ -30,23 +271,46 @@ class SecurityManager:
             # Configure resource limits
             self._setup_resource_limits(container_name, config)
             
+            identity = self._isolation_identity(container_name)
+            if identity:
+                STAMP_DIR.mkdir(parents=True, exist_ok=True)
+                _write_bytes(stamp_path, f"{cfg_hash}:{identity}".encode())
+            
             self.logger.info(f"Container isolation configured for {container_name}")
             
         except Exception as e:
             self.logger.error(f"Failed to set up container isolation: {e}")
             raise
             
+    @staticmethod
+    def _isolation_identity(container_name: str) -> Optional[str]:
+        """Inode numbers of the container's netns and cgroup, or None if either is gone"""
+        try:
+            netns = os.stat(f"/run/netns/netns_{container_name}").st_ino
+            cgroup = os.stat(f"/sys/fs/cgroup/memory/{container_name}").st_ino
+        except FileNotFoundError:
+            return None
+        return f"{netns}-{cgroup}"
+        
     def setup_network_security(self, container_name: str, config: Dict[str, Any]) -> None:
         """Configure network security rules"""
         try:
+            ip_cmds, ns_cmds = [], []
+            ipt_rules = {'filter': [], 'nat': []}
+            
             # Set up base iptables rules
-            self._setup_base_iptables()
+            self._setup_base_iptables(ipt_rules)
             
             # Configure container-specific rules
-            self._setup_container_iptables(container_name, config)
+            self._setup_container_iptables(container_name, config, ipt_rules)
             
             # Set up network namespace routing
-            self._setup_namespace_routing(container_name)
+            self._setup_namespace_routing(container_name, ip_cmds, ns_cmds)
+            
+            # Apply network changes in one iptables-restore and one ip batch per namespace
+            self._iptables_restore(ipt_rules)
+            self._ip_batch(ip_cmds)
+            self._ip_batch(ns_cmds, f"netns_{container_name}")
             
             # Configure DNS security
             self._setup_dns_security(container_name)
@@ -57,215 +321,86 @@ class SecurityManager:
             self.logger.error(f"Failed to set up network security: {e}")
             raise
             
-    def _create_network_namespace(self, namespace: str) -> None:
+    def _ip_batch(self, commands: List[str], namespace: Optional[str] = None) -> None:
+        """Run ip commands through a single 'ip -batch' process"""
+        if not commands:
+            return
+        argv = ['ip', '-n', namespace, '-batch', '-'] if namespace else ['ip', '-batch', '-']
+        subprocess.run(argv, input="\n".join(commands) + "\n", text=True, check=True)
+        
+    def _iptables_restore(self, rules: Dict[str, List[str]]) -> None:
+        """Apply per-table iptables rules through a single iptables-restore process"""
+        blob = "".join(
+            f"*{table}\n" + "\n".join(lines) + "\nCOMMIT\n"
+            for table, lines in rules.items() if lines
+        )
+        if blob:
+            subprocess.run(['iptables-restore', '--noflush'], input=blob, text=True, check=True)
+            
+    def _create_network_namespace(self, namespace: str, ip_cmds: List[str], ns_cmds: List[str]) -> None:
         """Create isolated network namespace"""
-        subprocess.run(['ip', 'netns', 'add', namespace], check=True)
+        ip_cmds.append(f"netns add {namespace}")
         
         # Create veth pair
         veth0 = f"veth0_{namespace}"
         veth1 = f"veth1_{namespace}"
-        subprocess.run(['ip', 'link', 'add', veth0, 'type', 'veth', 'peer', 'name', veth1], check=True)
+        ip_cmds.append(f"link add {veth0} type veth peer name {veth1}")
         
         # Move one end to namespace
-        subprocess.run(['ip', 'link', 'set', veth1, 'netns', namespace], check=True)
+        ip_cmds.append(f"link set {veth1} netns {namespace}")
         
         # Configure interfaces
-        subprocess.run(['ip', 'addr', 'add', '10.0.0.1/24', 'dev', veth0], check=True)
-        subprocess.run(['ip', 'netns', 'exec', namespace, 'ip', 'addr', 'add', '10.0.0.2/24', 'dev', veth1], check=True)
+        ip_cmds.append(f"addr add 10.0.0.1/24 dev {veth0}")
+        ns_cmds.append(f"addr add 10.0.0.2/24 dev {veth1}")
         
         # Bring up interfaces
-        subprocess.run(['ip', 'link', 'set', veth0, 'up'], check=True)
-        subprocess.run(['ip', 'netns', 'exec', namespace, 'ip', 'link', 'set', 'veth1', 'up'], check=True)
+        ip_cmds.append(f"link set {veth0} up")
+        ns_cmds.append(f"link set {veth1} up")
             
-    def _configure_network_isolation(self, namespace: str, config: Dict[str, Any]) -> None:
+    def _configure_network_isolation(self, namespace: str, config: Dict[str, Any],
+                                     ns_cmds: List[str], ipt_rules: Dict[str, List[str]]) -> None:
         """Configure network isolation for namespace"""
         # Set up routing
-        subprocess.run(['ip', 'netns', 'exec', namespace, 'ip', 'route', 'add', 'default', 'via', '10.0.0.1'], check=True)
+        ns_cmds.append("route replace default via 10.0.0.1")
         
         # Enable IP forwarding
-        with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
-            f.write('1')
+        _write_bytes('/proc/sys/net/ipv4/ip_forward', b'1')
             
         # Configure NAT
-        subprocess.run([
-            'iptables', '-t', 'nat', '-A', 'POSTROUTING',
-            '-s', '10.0.0.0/24', '-j', 'MASQUERADE'
-        ], check=True)
+        ipt_rules['nat'].append("-A POSTROUTING -s 10.0.0.0/24 -j MASQUERADE")
             
     def _setup_seccomp_profile(self, container_name: str) -> None:
-        """Set up seccomp profile for container"""
-        profile = {
-            "defaultAction": "SCMP_ACT_ERRNO",
-            "architectures": ["SCMP_ARCH_X86_64"],
-            "syscalls": [
-                {
-                    "names": [
-                        "accept", "bind", "connect", "socket",
-                        "read", "write", "close", "fstat",
-                        "lseek", "mmap", "mprotect", "munmap",
-                        "brk", "rt_sigaction", "rt_sigprocmask",
-                        "rt_sigreturn", "ioctl", "access", "pipe",
-                        "select", "mremap", "sched_yield", "msync",
-                        "mincore", "madvise", "shmget", "shmat",
-                        "shmctl", "dup", "dup2", "pause", "nanosleep",
-                        "getitimer", "alarm", "setitimer", "getpid",
-                        "sendfile", "socket", "connect", "accept",
-                        "sendto", "recvfrom", "sendmsg", "recvmsg",
-                        "shutdown", "bind", "listen", "getsockname",
-                        "getpeername", "socketpair", "setsockopt",
-                        "getsockopt", "clone", "fork", "vfork",
-                        "execve", "exit", "wait4", "kill", "uname",
-                        "semget", "semop", "semctl", "shmdt",
-                        "msgget", "msgsnd", "msgrcv", "msgctl",
-                        "fcntl", "flock", "fsync", "fdatasync",
-                        "truncate", "ftruncate", "getcwd", "chdir",
-                        "fchdir", "rename", "mkdir", "rmdir",
-                        "creat", "link", "unlink", "symlink",
-                        "readlink", "chmod", "fchmod", "chown",
-                        "fchown", "lchown", "umask", "gettimeofday",
-                        "getrlimit", "getrusage", "sysinfo",
-                        "times", "ptrace", "getuid", "syslog",
-                        "getgid", "setuid", "setgid", "geteuid",
-                        "getegid", "setpgid", "getppid", "getpgrp",
-                        "setsid", "setreuid", "setregid",
-                        "getgroups", "setgroups", "setresuid",
-                        "getresuid", "setresgid", "getresgid",
-                        "getpgid", "setfsuid", "setfsgid", "getsid",
-                        "capget", "capset", "rt_sigpending",
-                        "rt_sigtimedwait", "rt_sigqueueinfo",
-                        "rt_sigsuspend", "sigaltstack",
-                        "utime", "mknod", "uselib", "personality",
-                        "ustat", "statfs", "fstatfs", "sysfs",
-                        "getpriority", "setpriority", "sched_setparam",
-                        "sched_getparam", "sched_setscheduler",
-                        "sched_getscheduler", "sched_get_priority_max",
-                        "sched_get_priority_min", "sched_rr_get_interval",
-                        "mlock", "munlock", "mlockall", "munlockall",
-                        "vhangup", "modify_ldt", "pivot_root",
-                        "_sysctl", "prctl", "arch_prctl", "adjtimex",
-                        "setrlimit", "chroot", "sync", "acct",
-                        "mount", "umount2", "swapon", "swapoff",
-                        "reboot", "sethostname", "setdomainname",
-                        "iopl", "ioperm", "create_module",
-                        "init_module", "delete_module", "get_kernel_syms",
-                        "query_module", "quotactl", "nfsservctl",
-                        "getpmsg", "putpmsg", "afs_syscall",
-                        "tuxcall", "security", "gettid",
-                        "readahead", "setxattr", "lsetxattr",
-                        "fsetxattr", "getxattr", "lgetxattr",
-                        "fgetxattr", "listxattr", "llistxattr",
-                        "flistxattr", "removexattr", "lremovexattr",
-                        "fremovexattr", "tkill", "time",
-                        "futex", "sched_setaffinity",
-                        "sched_getaffinity", "set_thread_area",
-                        "io_setup", "io_destroy", "io_getevents",
-                        "io_submit", "io_cancel", "get_thread_area",
-                        "lookup_dcookie", "epoll_create",
-                        "epoll_ctl_old", "epoll_wait_old",
-                        "remap_file_pages", "getdents64",
-                        "set_tid_address", "restart_syscall",
-                        "semtimedop", "fadvise64", "timer_create",
-                        "timer_settime", "timer_gettime",
-                        "timer_getoverrun", "timer_delete",
-                        "clock_settime", "clock_gettime",
-                        "clock_getres", "clock_nanosleep",
-                        "exit_group", "epoll_wait", "epoll_ctl",
-                        "tgkill", "utimes", "vserver",
-                        "mbind", "set_mempolicy", "get_mempolicy",
-                        "mq_open", "mq_unlink", "mq_timedsend",
-                        "mq_timedreceive", "mq_notify",
-                        "mq_getsetattr", "kexec_load",
-                        "waitid", "add_key", "request_key",
-                        "keyctl", "ioprio_set", "ioprio_get",
-                        "inotify_init", "inotify_add_watch",
-                        "inotify_rm_watch", "migrate_pages",
-                        "openat", "mkdirat", "mknodat",
-                        "fchownat", "futimesat", "newfstatat",
-                        "unlinkat", "renameat", "linkat",
-                        "symlinkat", "readlinkat", "fchmodat",
-                        "faccessat", "pselect6", "ppoll",
-                        "unshare", "set_robust_list",
-                        "get_robust_list", "splice", "tee",
-                        "sync_file_range", "vmsplice",
-                        "move_pages", "utimensat", "epoll_pwait",
-                        "signalfd", "timerfd_create",
-                        "eventfd", "fallocate", "timerfd_settime",
-                        "timerfd_gettime", "accept4",
-                        "signalfd4", "eventfd2", "epoll_create1",
-                        "dup3", "pipe2", "inotify_init1",
-                        "preadv", "pwritev", "rt_tgsigqueueinfo",
-                        "perf_event_open", "recvmmsg",
-                        "fanotify_init", "fanotify_mark",
-                        "prlimit64", "name_to_handle_at",
-                        "open_by_handle_at", "clock_adjtime",
-                        "syncfs", "sendmmsg", "setns",
-                        "getcpu", "process_vm_readv",
-                        "process_vm_writev", "kcmp",
-                        "finit_module", "sched_setattr",
-                        "sched_getattr", "renameat2",
-                        "seccomp", "getrandom", "memfd_create",
-                        "kexec_file_load", "bpf", "execveat",
-                        "userfaultfd", "membarrier", "mlock2",
-                        "copy_file_range", "preadv2", "pwritev2",
-                        "pkey_mprotect", "pkey_alloc",
-                        "pkey_free", "statx",
-                        "io_pgetevents", "rseq"
-                    ],
-                    "action": "SCMP_ACT_ALLOW"
-                }
-            ]
-        }
-        
+        """Set up seccomp profile for container as a link to the shared profile"""
         profile_path = Path(f"/etc/docker/seccomp/{container_name}.json")
+        if os.path.realpath(profile_path) == str(SECCOMP_SHARED_PATH):
+            return
+            
         profile_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(profile_path, 'w') as f:
-            json.dump(profile, f, indent=2)
+        # Write the shared profile once; every container links to it.
+        # Build it under a temp name and link it into place so a crash never leaves a partial profile.
+        if not SECCOMP_SHARED_PATH.exists():
+            tmp = SECCOMP_SHARED_PATH.with_name(f"{SECCOMP_SHARED_PATH.name}.{os.getpid()}.tmp")
+            _write_bytes(tmp, _SECCOMP_PROFILE_BYTES)
+            try:
+                os.link(tmp, SECCOMP_SHARED_PATH)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp)
+                
+        if profile_path.is_symlink() or profile_path.exists():
+            profile_path.unlink()
+        os.symlink(SECCOMP_SHARED_PATH, profile_path)
             
     def _setup_apparmor_profile(self, container_name: str) -> None:
         """Set up AppArmor profile for container"""
-        profile = f"""
-#include <tunables/global>
-
-profile {container_name} flags=(attach_disconnected,mediate_deleted) {{
-    #include <abstractions/base>
-    #include <abstractions/nameservice>
-    
-    network,
-    capability net_admin,
-    capability net_raw,
-    
-    deny @{PROC}/* w,   # deny write for all files directly in /proc
-    deny @{PROC}/{[^1-9]*,sys/kernel/shm*} rw,
-    deny @{PROC}/sysrq-trigger rwklx,
-    deny @{PROC}/mem rwklx,
-    deny @{PROC}/kmem rwklx,
-    deny @{PROC}/kcore rwklx,
-    deny mount,
-    deny /sys/[^f]*/** wklx,
-    deny /sys/f[^s]*/** wklx,
-    deny /sys/fs/[^c]*/** wklx,
-    deny /sys/fs/c[^g]*/** wklx,
-    deny /sys/fs/cg[^r]*/** wklx,
-    deny /sys/firmware/efi/efivars/** rwklx,
-    deny /sys/kernel/security/** rwklx,
-    
-    # Allow limited reads from /proc for own pid
-    owner @{PROC}/@{pid}/stat r,
-    owner @{PROC}/@{pid}/cmdline r,
-    owner @{PROC}/@{pid}/fd/ r,
-    
-    /etc/earnapp/** r,
-    owner /tmp/** rw,
-    owner /var/tmp/** rw,
-}}
-"""
+        profile = _APPARMOR_TMPL.substitute(name=container_name)
         
         profile_path = Path(f"/etc/apparmor.d/containers/{container_name}")
         profile_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(profile_path, 'w') as f:
-            f.write(profile)
+        _write_bytes(profile_path, profile.encode())
             
         # Load AppArmor profile
         subprocess.run(['apparmor_parser', '-r', '-W', str(profile_path)], check=True)
@@ -274,109 +409,85 @@ profile {container_name} flags=(attach_disconnected,mediate_deleted) {{
         """Set up resource limits for container"""
         resources = config.get('container', {}).get('resources', {})
         
-        # Create cgroup
+        # Create cgroup and keep its control files open for later updates
         cgroup_path = Path(f"/sys/fs/cgroup/memory/{container_name}")
         cgroup_path.mkdir(parents=True, exist_ok=True)
+        inode = os.stat(cgroup_path).st_ino
+        cached = self._cg_fds.get(container_name)
+        if cached is None or cached[0] != inode:
+            # A recreated container gets a new cgroup; release the old one's fds instead of leaking them
+            if cached is not None:
+                self._close_fds(cached[1:])
+                del self._cg_fds[container_name]
+            mem_fd = os.open(cgroup_path / 'memory.limit_in_bytes', os.O_WRONLY)
+            try:
+                cpu_fd = os.open(cgroup_path / 'cpu.shares', os.O_WRONLY)
+            except OSError:
+                os.close(mem_fd)
+                raise
+            cached = self._cg_fds[container_name] = (inode, mem_fd, cpu_fd)
+        _, mem_fd, cpu_fd = cached
         
         # Set memory limit
         memory_limit = resources.get('memory_limit', '1G')
-        with open(cgroup_path / 'memory.limit_in_bytes', 'w') as f:
-            f.write(str(self._parse_memory_limit(memory_limit)))
+        os.pwrite(mem_fd, b'%d' % self._parse_memory_limit(memory_limit), 0)
             
         # Set CPU limit
         cpu_shares = resources.get('cpu_shares', 1024)
-        with open(cgroup_path / 'cpu.shares', 'w') as f:
-            f.write(str(cpu_shares))
+        os.pwrite(cpu_fd, str(cpu_shares).encode(), 0)
             
-    def _setup_base_iptables(self) -> None:
+    def _setup_base_iptables(self, ipt_rules: Dict[str, List[str]]) -> None:
         """Set up base iptables rules"""
-        # Flush existing rules
-        subprocess.run(['iptables', '-F'], check=True)
-        subprocess.run(['iptables', '-X'], check=True)
-        
-        # Set default policies
-        subprocess.run(['iptables', '-P', 'INPUT', 'DROP'], check=True)
-        subprocess.run(['iptables', '-P', 'FORWARD', 'DROP'], check=True)
-        subprocess.run(['iptables', '-P', 'OUTPUT', 'DROP'], check=True)
-        
-        # Allow established connections
-        subprocess.run([
-            'iptables', '-A', 'INPUT',
-            '-m', 'conntrack',
-            '--ctstate', 'ESTABLISHED,RELATED',
-            '-j', 'ACCEPT'
-        ], check=True)
-        
-        subprocess.run([
-            'iptables', '-A', 'OUTPUT',
-            '-m', 'conntrack',
-            '--ctstate', 'ESTABLISHED,RELATED',
-            '-j', 'ACCEPT'
-        ], check=True)
-            
-    def _setup_container_iptables(self, container_name: str, config: Dict[str, Any]) -> None:
+        ipt_rules['filter'].extend([
+            # Set default policies
+            ":INPUT DROP [0:0]",
+            ":FORWARD DROP [0:0]",
+            ":OUTPUT DROP [0:0]",
+            
+            # Flush existing rules
+            "-F",
+            "-X",
+            
+            # Allow established connections
+            "-A INPUT -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT",
+            "-A OUTPUT -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT"
+        ])
+            
+    def _setup_container_iptables(self, container_name: str, config: Dict[str, Any],
+                                  ipt_rules: Dict[str, List[str]]) -> None:
         """Set up container-specific iptables rules"""
         # Allow DNS
-        subprocess.run([
-            'iptables', '-A', 'OUTPUT',
-            '-p', 'udp', '--dport', '53',
-            '-j', 'ACCEPT'
-        ], check=True)
+        ipt_rules['filter'].append("-A OUTPUT -p udp --dport 53 -j ACCEPT")
         
         # Allow HTTP/HTTPS
-        for port in [80, 443]:
-            subprocess.run([
-                'iptables', '-A', 'OUTPUT',
-                '-p', 'tcp', '--dport', str(port),
-                '-j', 'ACCEPT'
-            ], check=True)
+        ipt_rules['filter'].append("-A OUTPUT -p tcp -m multiport --dports 80,443 -j ACCEPT")
             
         # Set up NAT for container
-        subprocess.run([
-            'iptables', '-t', 'nat', '-A', 'POSTROUTING',
-            '-s', '10.0.0.0/24',
-            '-j', 'MASQUERADE'
-        ], check=True)
+        ipt_rules['nat'].append("-A POSTROUTING -s 10.0.0.0/24 -j MASQUERADE")
             
-    def _setup_namespace_routing(self, container_name: str) -> None:
+    def _setup_namespace_routing(self, container_name: str, ip_cmds: List[str], ns_cmds: List[str]) -> None:
         """Set up routing for network namespace"""
         namespace = f"netns_{container_name}"
         
         # Enable IP forwarding in namespace
-        subprocess.run([
-            'ip', 'netns', 'exec', namespace,
-            'sysctl', '-w', 'net.ipv4.ip_forward=1'
-        ], check=True)
+        ip_cmds.append(f"netns exec {namespace} sysctl -w net.ipv4.ip_forward=1")
         
         # Set up default route
-        subprocess.run([
-            'ip', 'netns', 'exec', namespace,
-            'ip', 'route', 'add', 'default',
-            'via', '10.0.0.1'
-        ], check=True)
+        ns_cmds.append("route replace default via 10.0.0.1")
             
     def _setup_dns_security(self, container_name: str) -> None:
         """Set up DNS security for container"""
         namespace = f"netns_{container_name}"
         
         # Create resolv.conf for namespace
-        resolv_conf = f"""
-nameserver 1.1.1.1
-nameserver 8.8.8.8
-options edns0
-options trust-ad
-"""
-        
         resolv_path = Path(f"/etc/netns/{namespace}")
         resolv_path.mkdir(parents=True, exist_ok=True)
         
-        with open(resolv_path / 'resolv.conf', 'w') as f:
-            f.write(resolv_conf)
+        # Write beside the target and rename so the namespace never sees a partial file
+        tmp = resolv_path / 'resolv.conf.tmp'
+        _write_bytes(tmp, _RESOLV_BYTES)
+        os.rename(tmp, resolv_path / 'resolv.conf')
             
     def _parse_memory_limit(self, limit: str) -> int:
         """Convert memory limit string to bytes"""
-        units = {'B': 1, 'K': 1024, 'M': 1024*1024, 'G': 1024*1024*1024}
-        unit = limit[-1].upper()
-        if unit not in units:
-            raise ValueError(f"Invalid memory limit unit: {unit}")
-        return int(limit[:-1]) * units[unit] 
\ No newline at end of file
+        return _parse_memory_limit(limit) 
\ No newline at end of file
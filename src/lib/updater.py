@@ -2,72 +2,289 @@
 
 import os
 import sys
+import ctypes
 import json
 import shutil
+import hashlib
 import logging
-import requests
-import subprocess
+import zipfile
+import threading
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from packaging.version import Version, InvalidVersion
 
 logger = logging.getLogger(__name__)
 
+def _dir_size(path: str) -> int:
+    """Total size in bytes of all files under path, without following symlinks"""
+    total = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+def _copy_one(src: str, dst: str):
+    """Copy a single file in-kernel where possible, preserving metadata"""
+    st = os.stat(src)
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, st.st_mode & 0o7777)
+        try:
+            remaining = st.st_size
+            try:
+                while remaining > 0:
+                    if hasattr(os, 'copy_file_range'):
+                        n = os.copy_file_range(src_fd, dst_fd, remaining)
+                    else:
+                        n = os.sendfile(dst_fd, src_fd, None, remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+            except OSError:
+                # Cross-device or unsupported filesystem: plain userspace copy
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+                with os.fdopen(os.dup(src_fd), 'rb') as fsrc, os.fdopen(os.dup(dst_fd), 'wb') as fdst:
+                    shutil.copyfileobj(fsrc, fdst, 1 << 20)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+
+def _fast_copytree(src, dst, exclude=()):
+    """copytree replacement that copies files concurrently, skipping exclude dirs"""
+    src, dst = os.path.abspath(src), os.path.abspath(dst)
+    skip = {dst, *(os.path.abspath(p) for p in exclude)}
+    os.makedirs(dst, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        futures = []
+        for root, dirs, files in os.walk(src, followlinks=True):
+            # Never descend into the destination (or excluded dirs) when they live inside src
+            dirs[:] = [d for d in dirs if os.path.join(root, d) not in skip]
+            target = os.path.join(dst, os.path.relpath(root, src))
+            for d in dirs:
+                os.makedirs(os.path.join(target, d), exist_ok=True)
+            for name in files:
+                futures.append(pool.submit(_copy_one, os.path.join(root, name), os.path.join(target, name)))
+        for future in futures:
+            future.result()
+    shutil.copystat(src, dst)
+
+def _extract_zip(archive: Path, dest: Path):
+    """Extract a zip archive, decompressing members concurrently"""
+    with zipfile.ZipFile(archive) as z:
+        members = z.infolist()
+    
+    # Create the directory skeleton up front so workers never race on makedirs
+    root = dest.resolve()
+    files = []
+    for info in members:
+        # ZipFile.extract sanitizes names itself, but this mkdir does not; refuse escapes
+        target = (root / info.filename).resolve()
+        if target != root and root not in target.parents:
+            raise ValueError(f"Unsafe path in update archive: {info.filename}")
+        if info.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            files.append(info.filename)
+    
+    # ZipFile handles are not thread-safe, so each worker opens its own
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    
+    def extract(name):
+        z = getattr(local, 'zip', None)
+        if z is None:
+            z = local.zip = zipfile.ZipFile(archive)
+            with handles_lock:
+                handles.append(z)
+        z.extract(name, dest)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+            list(pool.map(extract, files))
+    finally:
+        for z in handles:
+            z.close()
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+def _rename_exchange(a: Path, b: Path) -> bool:
+    """Atomically swap two paths with renameat2(RENAME_EXCHANGE) where supported"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return False
+    return renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0
+
+def _swap_dir(staged: Path, target: Path, keep: Tuple[str, ...] = ()):
+    """Replace target with the fully staged tree, then drop the displaced one"""
+    for name in keep:
+        shutil.rmtree(staged / name, ignore_errors=True)
+    
+    if target.exists() and _rename_exchange(staged, target):
+        old = staged
+    else:
+        old = target.with_name(target.name + '.old')
+        shutil.rmtree(old, ignore_errors=True)
+        if target.exists():
+            os.rename(target, old)
+        os.rename(staged, target)
+    
+    # Carry over live subtrees (e.g. backups) that must survive the swap
+    for name in keep:
+        if (old / name).exists():
+            os.rename(old / name, target / name)
+    shutil.rmtree(old, ignore_errors=True)
+
+def _stage_dir(src: Path, target: Path) -> Path:
+    """Place a copy of src beside target, ready to be swapped in"""
+    staged = target.with_name(target.name + '.new')
+    shutil.rmtree(staged, ignore_errors=True)
+    _fast_copytree(src, staged)
+    return staged
+
 class Updater:
     def __init__(self, config_dir: Path = Path("/etc/yashaoxen")):
         self.config_dir = config_dir
         self.version_file = self.config_dir / "version.json"
         self.backup_dir = self.config_dir / "backups"
+        self.src_dir = Path(__file__).resolve().parent.parent
         self.repo_url = "https://api.github.com/repos/jonfedric/YashaoXen"  # Updated repository URL
+        self._latest_release: Optional[Dict[str, Any]] = None
+        # (download URL, expected sha256) for the latest release, fresh or from version.json
+        self._archive: Optional[Tuple[str, Optional[str]]] = None
         self.current_version = self._get_current_version()
+        # One client for the API check and the download so the TLS connection is reused
+        self._http = httpx.Client(
+            http2=True,
+            timeout=10,
+            follow_redirects=True,
+            headers={'User-Agent': f'YashaoXen/{self.current_version}'}
+        )
 
-    def _get_current_version(self) -> str:
-        """Get current version from version file"""
+    def close(self):
+        """Close the HTTP client"""
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_version_data(self) -> Dict[str, Any]:
+        """Load version file contents"""
         try:
             if self.version_file.exists():
                 with open(self.version_file, 'r') as f:
-                    data = json.load(f)
-                    return data.get('version', '0.0.0')
-            return '0.0.0'
+                    return json.load(f)
         except Exception as e:
             logger.error(f"Error reading version file: {e}")
-            return '0.0.0'
+        return {}
 
-    def _save_version(self, version: str):
-        """Save version information"""
+    def _get_current_version(self) -> str:
+        """Get current version from version file"""
+        return self._load_version_data().get('version', '0.0.0')
+
+    def _save_version(self, version: Optional[str] = None, **extra):
+        """Save version information, keeping any cached release metadata"""
         try:
+            data = self._load_version_data()
+            if version is not None:
+                data['version'] = version
+            data.update(extra)
             with open(self.version_file, 'w') as f:
-                json.dump({'version': version}, f)
+                json.dump(data, f)
         except Exception as e:
             logger.error(f"Error saving version: {e}")
 
+    def _is_newer(self, latest_version: Optional[str]) -> bool:
+        """Compare release versions numerically rather than lexically"""
+        if not latest_version:
+            return False
+        try:
+            return Version(latest_version) > Version(self.current_version)
+        except InvalidVersion:
+            return latest_version != self.current_version
+
     def check_for_updates(self) -> Optional[str]:
         """Check for available updates"""
         try:
-            response = requests.get(f"{self.repo_url}/releases/latest")
+            cached = self._load_version_data()
+            headers = {'Accept': 'application/vnd.github+json'}
+            # A 304 is only usable if the archive URL and digest were stored with the ETag
+            if cached.get('etag') and 'archive_url' in cached:
+                headers['If-None-Match'] = cached['etag']
+            
+            response = self._http.get(f"{self.repo_url}/releases/latest", headers=headers, timeout=5)
+            if response.status_code == 304:
+                # Release unchanged since last check; reuse the stored version and archive
+                self._archive = (cached['archive_url'], cached.get('archive_digest'))
+                latest_version = cached.get('latest')
+                return latest_version if self._is_newer(latest_version) else None
             if response.status_code == 200:
-                latest_version = response.json()['tag_name'].lstrip('v')
-                if latest_version > self.current_version:
+                self._latest_release = response.json()
+                latest_version = self._latest_release['tag_name'].lstrip('v')
+                self._archive = self._release_archive()
+                self._save_version(etag=response.headers.get('ETag'), latest=latest_version,
+                                   archive_url=self._archive[0], archive_digest=self._archive[1])
+                if self._is_newer(latest_version):
                     return latest_version
             return None
         except Exception as e:
             logger.error(f"Error checking for updates: {e}")
             return None
 
+    def _release_archive(self) -> Tuple[str, Optional[str]]:
+        """Get download URL and expected sha256 for the latest release archive"""
+        release = self._latest_release or {}
+        for asset in release.get('assets', []):
+            digest = asset.get('digest') or ''
+            if asset.get('name', '').endswith('.zip') and digest.startswith('sha256:'):
+                return asset['browser_download_url'], digest[len('sha256:'):]
+        return release.get('zipball_url', f"{self.repo_url}/releases/latest/zipball"), None
+
+    def _download(self, url: str, dest: Path) -> str:
+        """Stream url into dest and return the sha256 hex digest"""
+        h = hashlib.sha256()
+        with self._http.stream('GET', url) as r:
+            r.raise_for_status()
+            with open(dest, 'wb') as f:
+                for chunk in r.iter_bytes(chunk_size=1 << 20):
+                    f.write(chunk)
+                    h.update(chunk)
+        return h.hexdigest()
+
     def backup_current_installation(self):
         """Backup current installation"""
         try:
-            timestamp = subprocess.check_output(['date', '+%Y%m%d_%H%M%S']).decode().strip()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_path = self.backup_dir / f"backup_{timestamp}"
             
             # Create backup directory
             self.backup_dir.mkdir(parents=True, exist_ok=True)
             
-            # Backup configuration
-            shutil.copytree(self.config_dir, backup_path / "config", dirs_exist_ok=True)
+            # Backup configuration; earlier backups and update staging are not config
+            _fast_copytree(self.config_dir, backup_path / "config",
+                           exclude=(self.backup_dir, self.config_dir / "update"))
             
             # Backup source code
-            src_dir = Path(__file__).parent.parent
-            shutil.copytree(src_dir, backup_path / "src", dirs_exist_ok=True)
+            _fast_copytree(self.src_dir, backup_path / "src")
             
             logger.info(f"Backup created at: {backup_path}")
             return backup_path
@@ -91,27 +308,33 @@ class Updater:
             self.backup_current_installation()
             
             # Download latest release
-            response = requests.get(f"{self.repo_url}/releases/latest/zipball")
-            if response.status_code != 200:
-                raise Exception("Failed to download update")
-                
-            # Extract update
             update_dir = self.config_dir / "update"
             update_dir.mkdir(parents=True, exist_ok=True)
             
+            url, expected_digest = self._archive or self._release_archive()
             update_zip = update_dir / "update.zip"
-            with open(update_zip, 'wb') as f:
-                f.write(response.content)
+            digest = self._download(url, update_zip)
+            if expected_digest is None:
+                logger.warning("Release does not publish an archive digest, skipping verification")
+            elif digest != expected_digest:
+                raise Exception(f"Checksum mismatch for update archive: {digest}")
                 
-            shutil.unpack_archive(update_zip, update_dir)
+            # Extract update
+            _extract_zip(update_zip, update_dir)
             
             # Apply update
-            src_dir = Path(__file__).parent.parent
+            src_dir = self.src_dir
             extracted_dir = next(update_dir.glob('*-*'))  # Get extracted directory
             
-            # Update source code
-            shutil.rmtree(src_dir)
-            shutil.copytree(extracted_dir / "src", src_dir)
+            # Update source code: stage beside the live tree, then swap
+            staged = src_dir.with_name(src_dir.name + '.new')
+            shutil.rmtree(staged, ignore_errors=True)
+            try:
+                os.rename(extracted_dir / "src", staged)
+            except OSError:
+                # Extracted tree is on another filesystem
+                _fast_copytree(extracted_dir / "src", staged)
+            _swap_dir(staged, src_dir)
             
             # Clean up
             shutil.rmtree(update_dir)
@@ -131,25 +354,27 @@ class Updater:
         try:
             if not backup_timestamp:
                 # Get latest backup
-                backups = sorted(self.backup_dir.glob("backup_*"))
+                backups = self._backup_entries()
                 if not backups:
                     logger.error("No backups found")
                     return False
-                backup_path = backups[-1]
+                backup_path = Path(backups[-1].path)
             else:
                 backup_path = self.backup_dir / f"backup_{backup_timestamp}"
                 if not backup_path.exists():
                     logger.error(f"Backup not found: {backup_timestamp}")
                     return False
             
-            # Restore configuration
-            shutil.rmtree(self.config_dir)
-            shutil.copytree(backup_path / "config", self.config_dir)
+            # Stage both trees before touching the live ones
+            src_dir = self.src_dir
+            staged_src = _stage_dir(backup_path / "src", src_dir)
+            staged_config = _stage_dir(backup_path / "config", self.config_dir)
             
             # Restore source code
-            src_dir = Path(__file__).parent.parent
-            shutil.rmtree(src_dir)
-            shutil.copytree(backup_path / "src", src_dir)
+            _swap_dir(staged_src, src_dir)
+            
+            # Restore configuration, keeping the backups that live inside it
+            _swap_dir(staged_config, self.config_dir, keep=(self.backup_dir.name,))
             
             logger.info(f"Successfully rolled back to backup: {backup_path.name}")
             return True
@@ -158,15 +383,26 @@ class Updater:
             logger.error(f"Error during rollback: {e}")
             return False
 
+    def _backup_entries(self) -> list:
+        """Backup directories in the backup dir, oldest first"""
+        try:
+            with os.scandir(self.backup_dir) as it:
+                return sorted(
+                    (e for e in it if e.name.startswith('backup_') and e.is_dir(follow_symlinks=False)),
+                    key=lambda e: e.name
+                )
+        except FileNotFoundError:
+            return []
+
     def list_backups(self) -> list:
         """List available backups"""
         try:
             backups = []
-            for backup in sorted(self.backup_dir.glob("backup_*")):
+            for backup in self._backup_entries():
                 backups.append({
                     'timestamp': backup.name.replace('backup_', ''),
-                    'path': str(backup),
-                    'size': sum(f.stat().st_size for f in backup.rglob('*') if f.is_file()) / 1024 / 1024  # Size in MB
+                    'path': backup.path,
+                    'size': _dir_size(backup.path) / 1024 / 1024  # Size in MB
                 })
             return backups
         except Exception as e:
@@ -2,8 +2,8 @@
 
 import logging
 import json
-import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, Any
 from lib.proxy_handler import ProxyHandler
@@ -35,6 +35,9 @@ def main():
     setup_logging()
     logger = logging.getLogger(__name__)
     
+    # Container name -> original proxy config, so restarts need no API lookup
+    instance_proxies = {}
+    
     try:
         # Load configuration
         config = load_config()
@@ -47,8 +50,8 @@ def main():
         if not args.proxy_list or not Path(args.proxy_list).exists():
             raise Exception("Proxy list file not found")
             
-        with open(args.proxy_list) as f:
-            proxy_list = [line.strip().split(':') for line in f if line.strip()]
+        data = Path(args.proxy_list).read_text()
+        proxy_list = [tuple(line.strip().split(':', 3)) for line in data.splitlines() if line and not line.isspace()]
             
         # Create instances
         num_instances = min(
@@ -58,55 +61,62 @@ def main():
         
         logger.info(f"Creating {num_instances} instances (one per proxy)...")
         
-        for i in range(num_instances):
+        proxy_configs = []
+        for proxy in proxy_list[:num_instances]:
+            try:
+                host, port, *creds = proxy
+            except ValueError:
+                logger.error(f"Failed to create instance: invalid proxy entry {proxy[0]}")
+                continue
+            creds += [None] * (2 - len(creds))
+            proxy_configs.append({
+                'host': host,
+                'port': port,
+                'username': creds[0],
+                'password': creds[1]
+            })
+        
+        # Instance bring-up is dominated by Docker/subprocess waits, so overlap it
+        with ThreadPoolExecutor(max_workers=max(1, min(32, num_instances))) as pool:
+            futures = {pool.submit(instance_manager.create_instance, cfg): cfg for cfg in proxy_configs}
+            for future in as_completed(futures):
+                proxy_config = futures[future]
+                try:
+                    instance_id = future.result()
+                    instance_proxies[instance_id] = proxy_config
+                    logger.info(f"Created instance {instance_id} with dedicated proxy {proxy_config['host']}:{proxy_config['port']}")
+                except Exception as e:
+                    logger.error(f"Failed to create instance: {e}")
+                
+        # Monitor instances: react to container exits as Docker reports them
+        events = instance_manager.container_manager.client.events(
+            filters={'type': 'container', 'event': ['die', 'oom', 'kill']},
+            decode=True
+        )
+        for event in events:
+            instance_id = event.get('Actor', {}).get('Attributes', {}).get('name')
+            # Popping dedupes the kill/oom -> die sequence for a single exit
+            original_proxy = instance_proxies.pop(instance_id, None)
+            if original_proxy is None:
+                continue
+            
             try:
-                # Parse proxy details
-                proxy = proxy_list[i]
-                proxy_config = {
-                    'host': proxy[0],
-                    'port': proxy[1],
-                    'username': proxy[2] if len(proxy) > 2 else None,
-                    'password': proxy[3] if len(proxy) > 3 else None
-                }
+                logger.warning(f"Instance {instance_id} {event.get('Action')}, restarting...")
                 
-                # Create instance
-                instance_id = instance_manager.create_instance(proxy_config)
-                logger.info(f"Created instance {instance_id} with dedicated proxy {proxy_config['host']}:{proxy_config['port']}")
+                # Stop the instance
+                instance_manager.stop_instance(instance_id)
                 
-                # Wait between instances
-                time.sleep(2)
+                # Restart with same proxy
+                new_instance_id = instance_manager.create_instance(original_proxy)
+                instance_proxies[new_instance_id] = original_proxy
+                logger.info(f"Restarted instance as {new_instance_id} with same proxy")
                 
             except Exception as e:
-                logger.error(f"Failed to create instance: {e}")
-                continue
-                
-        # Monitor instances
-        while True:
-            for instance_id in list(instance_manager.instances.keys()):
-                try:
-                    status = instance_manager.get_instance_status(instance_id)
-                    
-                    if not status or status.get('status') != 'running':
-                        logger.warning(f"Instance {instance_id} not running, restarting...")
-                        
-                        # Get the instance's original proxy config
-                        original_proxy = instance_manager.instances[instance_id]['config']['proxy']
-                        
-                        # Stop the instance
-                        instance_manager.stop_instance(instance_id)
-                        
-                        # Restart with same proxy
-                        new_instance_id = instance_manager.create_instance(original_proxy)
-                        logger.info(f"Restarted instance as {new_instance_id} with same proxy")
-                        
-                except Exception as e:
-                    logger.error(f"Error monitoring instance {instance_id}: {e}")
-                    
-            time.sleep(60)
+                logger.error(f"Error monitoring instance {instance_id}: {e}")
             
     except KeyboardInterrupt:
         logger.info("Shutting down...")
-        for instance_id in list(instance_manager.instances.keys()):
+        for instance_id in list(instance_proxies):
             instance_manager.stop_instance(instance_id)
             
     except Exception as e:
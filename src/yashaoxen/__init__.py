@@ -6,7 +6,15 @@ __version__ = "1.0.0"
 __author__ = "oyash01"
 
 from .cli import main
-from .core import YashCore
-from .container import ContainerManager
 
-__all__ = ['main', 'YashCore', 'ContainerManager'] 
\ No newline at end of file
+__all__ = ['main', 'YashCore', 'ContainerManager']
+
+def __getattr__(name):
+    # Import docker-backed classes on first access so the CLI starts fast
+    if name == 'YashCore':
+        from .core import YashCore
+        return YashCore
+    if name == 'ContainerManager':
+        from .container import ContainerManager
+        return ContainerManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
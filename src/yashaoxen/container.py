@@ -1,53 +1,133 @@
 import os
+import copy
 import json
+import time
 import docker
 import logging
+import requests
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict
 from pathlib import Path
 from docker.models.containers import Container
 
+# Shared template; copy.deepcopy before mutating per container
+_EARNAPP_TEMPLATE = {
+    "image": "earnapp/earnapp:latest",
+    "environment": {
+        "EARNAPP_UUID": "",  # Will be generated per instance
+        "EARNAPP_DEVICE_NAME": "",  # Will be set per instance
+        "PROXY_ENABLED": "true",
+        "PROXY_URL": "",  # Will be set per instance
+        "TZ": "UTC"
+    },
+    "volumes": {
+        "/etc/yashaoxen/data": {
+            "bind": "/etc/earnapp",
+            "mode": "rw"
+        }
+    },
+    "network_mode": "bridge",
+    "restart_policy": {
+        "Name": "unless-stopped"
+    },
+    "cap_add": ["NET_ADMIN"],
+    "security_opt": ["seccomp=unconfined"],
+    "dns": ["1.1.1.1", "8.8.8.8"]
+}
+
+# HostConfig keys preserved across a recreate, mapped to containers.run() kwargs
+_HOSTCONFIG_KWARGS = {
+    "Binds": "volumes",
+    "Memory": "mem_limit",
+    "MemorySwap": "memswap_limit",
+    "CpuShares": "cpu_shares",
+    "CpuPeriod": "cpu_period",
+    "CpuQuota": "cpu_quota",
+    "CapAdd": "cap_add",
+    "SecurityOpt": "security_opt",
+    "Dns": "dns",
+}
+
+# Sized to the widest worker pool sharing one client, so threads never queue on the socket
+DOCKER_POOL_SIZE = 32
+
+# Seconds a successful ping vouches for the daemon connection
+PING_INTERVAL = 30
+
+STATS_TTL = 2.0
+STATS_CACHE_SIZE = 512
+
 class ContainerManager:
     def __init__(self):
         self.logger = logging.getLogger("ContainerManager")
-        self.client = docker.from_env()
+        self.client = docker.from_env(max_pool_size=DOCKER_POOL_SIZE)
+        self._last_ping = time.monotonic()
         self.earnapp_config = self._load_earnapp_config()
+        # container_id -> (expires_at, stats); LRU-ordered, entries live STATS_TTL seconds
+        self._stats_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats_lock = threading.Lock()
+        # container_id -> parsed Config.Env of containers this manager recreated
+        self._env_cache: Dict[str, Dict[str, str]] = {}
+        self._watcher = None
+
+    def _ensure_client(self):
+        """Ping the daemon if the connection is stale, reconnecting once on failure"""
+        if time.monotonic() - self._last_ping <= PING_INTERVAL:
+            return
+        try:
+            self.client.ping()
+        except (docker.errors.APIError, requests.exceptions.ConnectionError) as e:
+            self.logger.warning("Docker connection lost (%s), reconnecting", e)
+            self.client = docker.from_env(max_pool_size=DOCKER_POOL_SIZE)
+            self.client.ping()
+        self._last_ping = time.monotonic()
+
+    def _invalidate_stats(self, container_id: str):
+        """Drop cached stats for a container whose state just changed"""
+        with self._stats_lock:
+            self._stats_cache.pop(container_id, None)
+
+    def _watch_events(self):
+        """Start the event pump once, the first time there is cached data to keep honest"""
+        with self._stats_lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._event_pump, daemon=True)
+        self._watcher.start()
+
+    def _event_pump(self):
+        """Drop cached data for containers that stop, start or are removed"""
+        try:
+            events = self.client.api.events(
+                decode=True, filters={"type": "container", "event": ["start", "die", "oom", "destroy"]}
+            )
+            for event in events:
+                container_id = event.get("id")
+                self._invalidate_stats(container_id)
+                if event.get("Action") == "destroy":
+                    self._env_cache.pop(container_id, None)
+        except Exception as e:
+            self.logger.warning("Docker event stream closed: %s", e)
+        with self._stats_lock:
+            self._watcher = None
 
     def _load_earnapp_config(self) -> dict:
         """Load EarnApp container configuration"""
-        return {
-            "image": "earnapp/earnapp:latest",
-            "environment": {
-                "EARNAPP_UUID": "",  # Will be generated per instance
-                "EARNAPP_DEVICE_NAME": "",  # Will be set per instance
-                "PROXY_ENABLED": "true",
-                "PROXY_URL": "",  # Will be set per instance
-                "TZ": "UTC"
-            },
-            "volumes": {
-                "/etc/yashaoxen/data": {
-                    "bind": "/etc/earnapp",
-                    "mode": "rw"
-                }
-            },
-            "network_mode": "bridge",
-            "restart_policy": {
-                "Name": "unless-stopped"
-            },
-            "cap_add": ["NET_ADMIN"],
-            "security_opt": ["seccomp=unconfined"],
-            "dns": ["1.1.1.1", "8.8.8.8"]
-        }
+        return _EARNAPP_TEMPLATE
 
     def create_earnapp_container(self, proxy_url: str, memory_limit: str = "1G", 
                                security_config: dict = None) -> str:
         """Create new EarnApp container with proxy configuration"""
         try:
-            # Generate unique device name and UUID
-            device_name = f"yashaoxen_{os.urandom(4).hex()}"
-            uuid = os.urandom(16).hex()
+            # Generate unique device name and UUID from a single urandom read
+            raw = os.urandom(20)
+            device_name = f"yashaoxen_{raw[:4].hex()}"
+            uuid = raw[4:].hex()
 
             # Prepare container configuration
-            config = self.earnapp_config.copy()
+            config = copy.deepcopy(self.earnapp_config)
             config["environment"].update({
                 "EARNAPP_UUID": uuid,
                 "EARNAPP_DEVICE_NAME": device_name,
@@ -72,18 +152,25 @@ class ContainerManager:
                 "cpu_quota": 50000
             })
 
-            # Create and start container
-            container = self.client.containers.run(
-                self.earnapp_config["image"],
-                detach=True,
-                **config
-            )
+            # Create and start through the low-level API; run() would also inspect
+            # the new container just to build a Container object we don't need
+            self._ensure_client()
+            api = self.client.api
+            image = config.pop("image")
+            environment = config.pop("environment")
+            host_config = api.create_host_config(binds=config.pop("volumes"), **config)
+            try:
+                container_id = api.create_container(image, environment=environment, host_config=host_config)["Id"]
+            except docker.errors.ImageNotFound:
+                api.pull(image)
+                container_id = api.create_container(image, environment=environment, host_config=host_config)["Id"]
+            api.start(container_id)
 
-            self.logger.info(f"Created EarnApp container {container.id} with proxy {proxy_url}")
-            return container.id
+            self.logger.info("Created EarnApp container %s with proxy %s", container_id, proxy_url)
+            return container_id
 
         except Exception as e:
-            self.logger.error(f"Failed to create EarnApp container: {e}")
+            self.logger.error("Failed to create EarnApp container: %s", e)
             raise
 
     def stop_container(self, container_id: str):
@@ -91,9 +178,10 @@ class ContainerManager:
         try:
             container = self.client.containers.get(container_id)
             container.stop()
-            self.logger.info(f"Stopped container {container_id}")
+            self._invalidate_stats(container_id)
+            self.logger.info("Stopped container %s", container_id)
         except Exception as e:
-            self.logger.error(f"Failed to stop container {container_id}: {e}")
+            self.logger.error("Failed to stop container %s: %s", container_id, e)
             raise
 
     def start_container(self, container_id: str):
@@ -101,9 +189,9 @@ class ContainerManager:
         try:
             container = self.client.containers.get(container_id)
             container.start()
-            self.logger.info(f"Started container {container_id}")
+            self.logger.info("Started container %s", container_id)
         except Exception as e:
-            self.logger.error(f"Failed to start container {container_id}: {e}")
+            self.logger.error("Failed to start container %s: %s", container_id, e)
             raise
 
     def update_container_proxy(self, container_id: str, proxy_url: str):
@@ -111,31 +199,44 @@ class ContainerManager:
         try:
             container = self.client.containers.get(container_id)
             
-            # Update environment variables
-            env = dict(e.split('=', 1) for e in container.attrs['Config']['Env'])
+            # Update environment variables, reusing the env parsed on a previous recreate
+            env = self._env_cache.pop(container_id, None)
+            if env is None:
+                env = dict(e.split('=', 1) for e in container.attrs['Config']['Env'])
             env['PROXY_URL'] = proxy_url
             
-            # Recreate container with new proxy
+            # Recreate container with new proxy, carrying over the host settings run() accepts
+            host_config = container.attrs['HostConfig']
             new_container = self.client.containers.run(
-                container.image,
+                container.attrs['Config']['Image'],
                 detach=True,
                 environment=env,
-                **{k: v for k, v in container.attrs['HostConfig'].items() 
-                   if k not in ['NetworkMode', 'RestartPolicy']}
+                **{_HOSTCONFIG_KWARGS[k]: host_config[k]
+                   for k in _HOSTCONFIG_KWARGS.keys() & host_config.keys() if host_config[k]}
             )
             
+            self._env_cache[new_container.id] = env
+
             # Remove old container
             container.remove(force=True)
+            self._invalidate_stats(container_id)
             
-            self.logger.info(f"Updated proxy for container {container_id} to {proxy_url}")
+            self.logger.info("Updated proxy for container %s to %s", container_id, proxy_url)
             return new_container.id
             
         except Exception as e:
-            self.logger.error(f"Failed to update proxy for container {container_id}: {e}")
+            self.logger.error("Failed to update proxy for container %s: %s", container_id, e)
             raise
 
     def get_container_stats(self, container_id: str) -> Dict:
         """Get container statistics"""
+        now = time.monotonic()
+        with self._stats_lock:
+            cached = self._stats_cache.get(container_id)
+            if cached and cached[0] > now:
+                self._stats_cache.move_to_end(container_id)
+                return cached[1]
+        
         try:
             container = self.client.containers.get(container_id)
             stats = container.stats(stream=False)
@@ -147,24 +248,50 @@ class ContainerManager:
                           stats["precpu_stats"]["system_cpu_usage"]
             cpu_percent = (cpu_delta / system_delta) * 100.0
             
-            return {
+            result = {
                 "cpu_percent": cpu_percent,
                 "memory_usage": stats["memory_stats"]["usage"],
                 "network_rx": stats["networks"]["eth0"]["rx_bytes"],
                 "network_tx": stats["networks"]["eth0"]["tx_bytes"]
             }
             
+            with self._stats_lock:
+                self._stats_cache[container_id] = (time.monotonic() + STATS_TTL, result)
+                self._stats_cache.move_to_end(container_id)
+                if len(self._stats_cache) > STATS_CACHE_SIZE:
+                    self._stats_cache.popitem(last=False)
+            self._watch_events()
+            return result
+            
         except Exception as e:
-            self.logger.error(f"Failed to get stats for container {container_id}: {e}")
+            self.logger.error("Failed to get stats for container %s: %s", container_id, e)
             raise
 
+    def get_all_stats(self) -> Dict[str, Dict]:
+        """Get statistics for every running container, keyed by container id"""
+        ids = [c["Id"] for c in self.client.api.containers(size=False)]
+        
+        def fetch(container_id):
+            try:
+                return container_id, self.get_container_stats(container_id)
+            except Exception:
+                return container_id, None  # already logged by get_container_stats
+        
+        # Each stats call blocks ~1s for its sample, so issue them together
+        with ThreadPoolExecutor(max_workers=max(1, min(16, len(ids)))) as pool:
+            return {cid: stats for cid, stats in pool.map(fetch, ids) if stats is not None}
+
     def cleanup_containers(self):
         """Clean up stopped containers"""
         try:
-            for container in self.client.containers.list(all=True):
-                if container.status == "exited":
-                    container.remove()
-                    self.logger.info(f"Removed stopped container {container.id}")
+            # Let the daemon filter; only the ids come back, no Container objects are built
+            api = self.client.api
+            exited = api.containers(all=True, quiet=True, filters={"status": "exited"})
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                futures = {pool.submit(api.remove_container, c["Id"]): c["Id"] for c in exited}
+                for future in as_completed(futures):
+                    future.result()
+                    self.logger.info("Removed stopped container %s", futures[future])
         except Exception as e:
-            self.logger.error(f"Failed to cleanup containers: {e}")
+            self.logger.error("Failed to cleanup containers: %s", e)
             raise 
\ No newline at end of file
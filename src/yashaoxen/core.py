@@ -3,49 +3,191 @@ YashaoXen Core - Main implementation
 """
 
 import os
+import re
+import copy
 import json
+import hashlib
 import time
 import logging
-import docker
-import psutil
-import requests
-import subprocess
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
-from .container import ContainerManager
-from .proxy import ProxyManager
+from typing import Dict, Iterable, List, Optional
 from .security import SecurityManager
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@functools.lru_cache(maxsize=4)
+def _read_config(path: str, mtime_ns: int, size: int) -> tuple:
+    """Parse the config once per (mtime, size); edits bust the cache key."""
+    blob = Path(path).read_bytes()
+    config = json.loads(blob) if orjson is None else orjson.loads(blob)
+    return config, _config_digest(blob)
+
+def _config_digest(blob: bytes) -> bytes:
+    """Digest used to tell whether a config write would change anything."""
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+_MEM_RE = re.compile(r'(\d+)([kmgt]?)', re.I)
+_MEM_MULTIPLIERS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+@functools.lru_cache(maxsize=64)
+def _parse_memory(value: str) -> int:
+    """Convert a size like '512m' or '1g' to bytes."""
+    match = _MEM_RE.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Invalid memory size: {value}")
+    return int(match.group(1)) * _MEM_MULTIPLIERS[match.group(2).lower()]
+
+@functools.lru_cache(maxsize=1)
+def _cpu_count() -> int:
+    """CPU count; fixed for the life of the process."""
+    import psutil
+    return psutil.cpu_count()
+
+@functools.lru_cache(maxsize=1)
+def _available_memory(tick: int) -> int:
+    """Available memory, sampled at most once per half-second tick."""
+    import psutil
+    return psutil.virtual_memory().available
+
+# Seconds a system check result (iptables, AppArmor) is reused
+SYSTEM_CHECK_TTL = 60
+
+def _check_epoch() -> int:
+    """Current SYSTEM_CHECK_TTL window; part of the cache key so results expire."""
+    return int(time.monotonic() // SYSTEM_CHECK_TTL)
+
+@functools.lru_cache(maxsize=8)
+def _command_succeeds(cmd: tuple, epoch: int) -> bool:
+    """Run a check command once per epoch and report whether it exited 0."""
+    import subprocess
+    return subprocess.run(list(cmd), capture_output=True).returncode == 0
+
+EARNAPP_IMAGE = "earnapp/earnapp:latest"
+
+# Instances are found by label; the daemon indexes labels, a name filter is a regex scan
+INSTANCE_LABELS = {"yashaoxen": "1"}
+INSTANCE_FILTERS = {"label": "yashaoxen=1"}
+# Containers from releases before labelling can only be matched by name
+LEGACY_INSTANCE_FILTERS = {"name": "yashaoxen_earnapp_"}
+
+# Seconds a full check_installation() result is reused
+INSTALL_CHECK_TTL = 30
+
+# Seconds an instance listing is reused before Docker is asked again
+INSTANCE_CACHE_TTL = 5.0
+
+# Stats streams kept open at once; past this, stats fall back to one-shot samples
+MAX_STATS_PUMPS = 16
+
+@functools.lru_cache(maxsize=1)
+def _docker_client():
+    """Process-wide Docker client; building one re-reads the environment and TLS files."""
+    # docker-py is slow to import; load it with the first YashCore, not with the package
+    import docker
+    from .container import DOCKER_POOL_SIZE
+    return docker.from_env(max_pool_size=DOCKER_POOL_SIZE)
 
 class YashCore:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.docker_client = docker.from_env()
+        self.docker_client = _docker_client()
+        # One bounded pool for all fan-out; workers start on demand and stay warm between calls
+        from .container import DOCKER_POOL_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=DOCKER_POOL_SIZE, thread_name_prefix="yashcore")
+        # container_id -> instance record, populated once watch_instances() runs
+        self._instance_state: Optional[Dict[str, Dict]] = None
+        # (expires_at, records) from the last _inspect_instances() round
+        self._inspect_cache: Optional[tuple] = None
+        self._inspect_lock = threading.Lock()
+        # instance_id -> newest frame from that instance's stats stream
+        self._latest_stats: Dict[str, Dict] = {}
+        # instance_id -> stop flag of its running stats pump
+        self._stats_pumps: Dict[str, threading.Event] = {}
+        self._stats_lock = threading.Lock()
+        # Cleared once a full listing finds no unlabeled containers; new ones are always labelled
+        self._legacy_instances = True
+        # (checked_at, status) from the last check_installation()
+        self._install_check_cache: Optional[tuple] = None
+        self.config_path = Path("/etc/yashaoxen/config.json")
+        # Digest of the config bytes last read from or written to disk
+        self._last_cfg_hash: Optional[bytes] = None
         self.security = SecurityManager()
         self.config = self._load_config()
         self._load_proxies()
 
     def _load_config(self) -> Dict:
         """Load configuration from file."""
-        config_file = "/etc/yashaoxen/config.json"
-        if os.path.exists(config_file):
-            with open(config_file, 'r') as f:
-                return json.load(f)
-        return {}
+        config_file = str(self.config_path)
+        try:
+            st = os.stat(config_file)
+        except FileNotFoundError:
+            return {}
+        config, self._last_cfg_hash = _read_config(config_file, st.st_mtime_ns, st.st_size)
+        # Hand out a copy; the cached dict is shared by every YashCore in the process
+        return copy.deepcopy(config)
+
+    def _save_config(self) -> None:
+        """Write the config atomically, skipping the write if nothing changed."""
+        # Same layout as the CLI's save_config so an untouched file hashes equal
+        blob = json.dumps(self.config, indent=4).encode()
+        digest = _config_digest(blob)
+        if digest == self._last_cfg_hash:
+            return
+        try:
+            self.config_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.config_path.with_suffix('.json.tmp')
+            tmp.write_bytes(blob)
+            os.replace(tmp, self.config_path)
+            self._last_cfg_hash = digest
+        except OSError as e:
+            self.logger.error(f"Error saving config: {e}")
+            raise
 
     def _load_proxies(self) -> List[str]:
         """Load proxies from file."""
         self.proxies = []
-        proxy_file = "/etc/yashaoxen/proxies.txt"
-        if os.path.exists(proxy_file):
-            with open(proxy_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        self.proxies.append(line)
+        proxy_file = Path("/etc/yashaoxen/proxies.txt")
+        if proxy_file.exists():
+            # Split and strip in C rather than looping over the file line by line
+            lines = map(bytes.strip, proxy_file.read_bytes().splitlines())
+            self.proxies = [line.decode() for line in lines if line and not line.startswith(b'#')]
         return self.proxies
 
-    def _create_earnapp_container(self, instance_id: str, proxy: Optional[str] = None) -> str:
+    def _ensure_image(self) -> None:
+        """Pull the EarnApp image if the daemon doesn't have it yet."""
+        from docker.errors import ImageNotFound
+        api = self.docker_client.api
+        try:
+            api.inspect_image(EARNAPP_IMAGE)
+        except ImageNotFound:
+            api.pull(EARNAPP_IMAGE)
+
+    def _resource_limits(self) -> Dict:
+        """Container resource limits, with the CPU quota already converted."""
+        resources = dict(self.security.get_resource_limits())
+        resources["cpu_quota"] = int(float(resources["cpu"]) * 100000)
+        return resources
+
+    def _host_config(self) -> Dict:
+        """Docker host config shared by every EarnApp container."""
+        resources = self._resource_limits()
+        return self.docker_client.api.create_host_config(
+            restart_policy={"Name": "unless-stopped"},
+            mem_limit=resources["memory"],
+            cpu_period=100000,
+            cpu_quota=resources["cpu_quota"],
+            security_opt=self.security.get_container_security_opts()
+        )
+
+    def _create_earnapp_container(self, instance_id: str, proxy: Optional[str] = None,
+                                  host_config: Optional[Dict] = None) -> str:
         """Create a new EarnApp container instance."""
         try:
             # Get EarnApp token from config
@@ -60,23 +202,28 @@ class YashCore:
                 "PROXY_URL": proxy if proxy else ""
             }
 
-            # Get resource limits from security manager
-            resources = self.security.get_resource_limits()
-
-            # Create and start container
-            container = self.docker_client.containers.run(
-                "earnapp/earnapp:latest",
-                name=container_name,
-                environment=environment,
-                detach=True,
-                restart_policy={"Name": "unless-stopped"},
-                mem_limit=resources["memory"],
-                cpu_period=100000,
-                cpu_quota=int(float(resources["cpu"]) * 100000),
-                security_opt=self.security.get_container_security_opts()
-            )
+            # Build the host config unless the batch already did
+            if host_config is None:
+                host_config = self._host_config()
+
+            # Create and start container; run() would also inspect the result
+            from docker.errors import ImageNotFound
+            api = self.docker_client.api
+            try:
+                container_id = api.create_container(
+                    EARNAPP_IMAGE, name=container_name, environment=environment, host_config=host_config,
+                    labels={**INSTANCE_LABELS, "yashaoxen.instance_id": instance_id}
+                )["Id"]
+            except ImageNotFound:
+                self._ensure_image()
+                container_id = api.create_container(
+                    EARNAPP_IMAGE, name=container_name, environment=environment, host_config=host_config,
+                    labels={**INSTANCE_LABELS, "yashaoxen.instance_id": instance_id}
+                )["Id"]
+            api.start(container_id)
+            self._invalidate_instances()
 
-            return container.id
+            return container_id
         except Exception as e:
             self.logger.error(f"Failed to create container: {str(e)}")
             raise
@@ -91,21 +238,44 @@ class YashCore:
             if not self.proxies:
                 self.logger.warning("No proxies configured. Running without proxies.")
             
-            # Create instances
-            for i in range(num_instances):
-                proxy = self.proxies[i % len(self.proxies)] if self.proxies else None
-                instance_id = f"instance_{i+1}"
-                
-                # Verify proxy if configured
-                if proxy and not self.security.verify_proxy(proxy):
+            assignments = [
+                (f"instance_{i+1}", self.proxies[i % len(self.proxies)] if self.proxies else None)
+                for i in range(num_instances)
+            ]
+            
+            # Verify each distinct proxy once; checks are network-bound so run them concurrently
+            distinct = list({proxy for _, proxy in assignments if proxy})
+            verified = dict(zip(distinct, self._executor.map(self.security.verify_proxy, distinct)))
+            
+            # Check for the image once here rather than once per container
+            self._ensure_image()
+            
+            # Same host config for every container in the batch
+            host_config = self._host_config()
+            
+            # Create instances; the Docker daemon handles concurrent creates
+            failed = []
+            futures = {}
+            for instance_id, proxy in assignments:
+                # Skip instances whose proxy failed verification
+                if proxy and not verified[proxy]:
                     self.logger.warning(f"Proxy verification failed for {proxy}")
                     continue
-                
-                # Create container
-                self._create_earnapp_container(instance_id, proxy)
-                self.logger.info(f"Started instance {instance_id}")
-            
-            self.logger.info("All instances started successfully")
+                future = self._executor.submit(self._create_earnapp_container, instance_id, proxy, host_config)
+                futures[future] = instance_id
+            
+            # One failed create shouldn't abandon the rest of the batch
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    self.logger.info(f"Started instance {futures[future]}")
+                except Exception:
+                    failed.append(futures[future])  # already logged by _create_earnapp_container
+            
+            if failed:
+                self.logger.warning(f"{len(failed)} of {len(futures)} instances failed to start: {', '.join(sorted(failed))}")
+            else:
+                self.logger.info("All instances started successfully")
         except Exception as e:
             self.logger.error(f"Failed to start instances: {str(e)}")
             raise
@@ -113,54 +283,149 @@ class YashCore:
     def stop_all(self) -> None:
         """Stop all EarnApp instances."""
         try:
-            containers = self.docker_client.containers.list(
-                filters={"name": "yashaoxen_earnapp_"}
-            )
-            
-            for container in containers:
-                container.stop()
-                container.remove()
+            # Work on ids; Container objects would cost an inspect each
+            api = self.docker_client.api
+            for summary in self._instance_summaries():
+                api.stop(summary["Id"])
+                api.remove_container(summary["Id"])
+            self._stop_stats_pumps()
+            self._invalidate_instances()
             
             self.logger.info("All instances stopped successfully")
         except Exception as e:
             self.logger.error(f"Failed to stop instances: {str(e)}")
             raise
 
+    @staticmethod
+    def _describe(info: Dict) -> Dict:
+        """Reduce an inspect payload to the fields shown for an instance."""
+        # Docker reports UTC with nanoseconds; uptime is shown in whole seconds anyway
+        started_at = datetime.fromisoformat(info["State"]["StartedAt"][:19]).replace(tzinfo=timezone.utc)
+        # Get proxy from environment
+        proxy = next((e[10:] for e in info["Config"]["Env"] if e.startswith("PROXY_URL=")), "None")
+        return {
+            "name": info["Name"].lstrip("/").replace("yashaoxen_earnapp_", ""),
+            "status": info["State"]["Status"],
+            "proxy": proxy,
+            "started_at": started_at,
+        }
+
+    @staticmethod
+    def _with_uptime(instance: Dict) -> Dict:
+        """Render an instance record with its uptime as of now."""
+        started_at = instance["started_at"]
+        uptime = datetime.now(started_at.tzinfo) - started_at
+        return {
+            "name": instance["name"],
+            "status": instance["status"],
+            "proxy": instance["proxy"],
+            "uptime": str(uptime).split(".")[0]  # Remove microseconds
+        }
+
+    def _invalidate_instances(self) -> None:
+        """Drop the cached instance listing after a container change."""
+        self._inspect_cache = None
+
+    def _inspect_instances(self) -> Dict[str, Dict]:
+        """Inspect every instance container, keyed by container id; reused for INSTANCE_CACHE_TTL."""
+        with self._inspect_lock:
+            cached = self._inspect_cache
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            records = self._inspect_all()
+            self._inspect_cache = (time.monotonic() + INSTANCE_CACHE_TTL, records)
+            return records
+
+    def _instance_summaries(self, all: bool = False) -> List[Dict]:
+        """Container summaries for every instance, including unlabeled ones from older releases."""
+        api = self.docker_client.api
+        summaries = api.containers(all=all, filters=INSTANCE_FILTERS, size=False)
+        if self._legacy_instances:
+            seen = {c["Id"] for c in summaries}
+            legacy = [c for c in api.containers(all=all, filters=LEGACY_INSTANCE_FILTERS, size=False)
+                      if c["Id"] not in seen]
+            if all and not legacy:
+                self._legacy_instances = False
+            summaries += legacy
+        return summaries
+
+    def _inspect_all(self) -> Dict[str, Dict]:
+        """Inspect every instance container from Docker."""
+        api = self.docker_client.api
+        summaries = self._instance_summaries(all=True)
+        
+        # containers.list() inspects each container serially; overlap those round-trips
+        infos = list(self._executor.map(lambda c: api.inspect_container(c["Id"]), summaries))
+        records = {info["Id"]: self._describe(info) for info in infos}
+        stopped = [r["name"] for r in records.values() if r["status"] != "running"]
+        if stopped:
+            self._stop_stats_pumps(stopped)
+        return records
+
     def list_instances(self) -> List[Dict]:
         """List all running instances and their status."""
         try:
-            instances = []
-            containers = self.docker_client.containers.list(
-                all=True,
-                filters={"name": "yashaoxen_earnapp_"}
-            )
-            
-            for container in containers:
-                # Get container info
-                info = container.attrs
-                status = container.status
-                name = container.name.replace("yashaoxen_earnapp_", "")
-                
-                # Calculate uptime
-                started_at = datetime.fromisoformat(info["State"]["StartedAt"].replace("Z", "+00:00"))
-                uptime = datetime.now(started_at.tzinfo) - started_at
-                
-                # Get proxy from environment
-                env = dict(e.split("=") for e in info["Config"]["Env"] if "=" in e)
-                proxy = env.get("PROXY_URL", "None")
-                
-                instances.append({
-                    "name": name,
-                    "status": status,
-                    "proxy": proxy,
-                    "uptime": str(uptime).split(".")[0]  # Remove microseconds
-                })
-            
-            return instances
+            # Read once: the pump thread may reset the attribute to None at any point
+            state = self._instance_state
+            if state is not None:
+                # Kept current by the event pump; no Docker calls needed
+                return [self._with_uptime(i) for i in list(state.values())]
+            return [self._with_uptime(i) for i in self._inspect_instances().values()]
         except Exception as e:
             self.logger.error(f"Failed to list instances: {str(e)}")
             raise
 
+    def watch_instances(self, on_change=None) -> None:
+        """Track instance state from the Docker event stream so list_instances answers from memory."""
+        self._instance_state = self._inspect_all()
+        
+        def pump():
+            from docker.errors import NotFound
+            api = self.docker_client.api
+            # Unlabeled containers from older releases only show up without the label filter
+            legacy = self._legacy_instances
+            filters = {"type": "container"} if legacy else {"type": "container", **INSTANCE_FILTERS}
+            try:
+                for event in self.docker_client.events(decode=True, filters=filters):
+                    if legacy:
+                        attrs = event.get("Actor", {}).get("Attributes", {})
+                        if (attrs.get("yashaoxen") != "1"
+                                and not attrs.get("name", "").startswith("yashaoxen_earnapp_")):
+                            continue
+                    container_id = event["Actor"]["ID"]
+                    try:
+                        if event.get("Action") == "destroy":
+                            self._instance_state.pop(container_id, None)
+                        else:
+                            self._instance_state[container_id] = self._describe(api.inspect_container(container_id))
+                    except NotFound:
+                        self._instance_state.pop(container_id, None)
+                    except Exception as e:
+                        self.logger.error(f"Failed to refresh instance {container_id}: {str(e)}")
+                        continue
+                    if on_change:
+                        on_change()
+            except Exception as e:
+                self.logger.error(f"Docker event stream lost: {str(e)}")
+            # Without the stream the table would go stale; fall back to inspecting
+            self._instance_state = None
+            if on_change:
+                on_change()
+        
+        threading.Thread(target=pump, daemon=True).start()
+
+    def _recreate_with_proxy(self, name: str, proxy: str, host_config: Optional[Dict] = None) -> str:
+        """Replace an instance's container with one using the given proxy."""
+        # Stop old container
+        api = self.docker_client.api
+        api.stop(f"yashaoxen_earnapp_{name}")
+        api.remove_container(f"yashaoxen_earnapp_{name}")
+        self._stop_stats_pumps([name])
+        self._invalidate_instances()
+        
+        # Create new container with rotated proxy
+        return self._create_earnapp_container(name, proxy, host_config)
+
     def rotate_proxies(self) -> None:
         """Rotate proxies for all instances."""
         try:
@@ -169,23 +434,33 @@ class YashCore:
                 return
             
             instances = self.list_instances()
-            for i, instance in enumerate(instances):
-                # Get next proxy
-                proxy = self.proxies[i % len(self.proxies)]
-                
-                # Verify proxy
-                if not self.security.verify_proxy(proxy):
+            num_proxies = len(self.proxies)
+            assignments = [(instance['name'], self.proxies[i % num_proxies]) for i, instance in enumerate(instances)]
+            
+            # Verify each distinct proxy once, concurrently
+            distinct = list({proxy for _, proxy in assignments})
+            verified = dict(zip(distinct, self._executor.map(self.security.verify_proxy, distinct)))
+            
+            # Check for the image once here rather than once per container
+            self._ensure_image()
+            
+            # Same host config for every container in the batch
+            host_config = self._host_config()
+            
+            # Recreate containers concurrently; each rotation is independent Docker I/O
+            futures = {}
+            for name, proxy in assignments:
+                if not verified[proxy]:
                     self.logger.warning(f"Proxy verification failed for {proxy}")
                     continue
-                
-                # Stop old container
-                container = self.docker_client.containers.get(f"yashaoxen_earnapp_{instance['name']}")
-                container.stop()
-                container.remove()
-                
-                # Create new container with rotated proxy
-                self._create_earnapp_container(instance['name'], proxy)
-                self.logger.info(f"Rotated proxy for {instance['name']}")
+                futures[self._executor.submit(self._recreate_with_proxy, name, proxy, host_config)] = name
+            
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    self.logger.info(f"Rotated proxy for {futures[future]}")
+                except Exception as e:
+                    self.logger.error(f"Failed to rotate proxy for {futures[future]}: {str(e)}")
             
             self.logger.info("Proxy rotation completed")
         except Exception as e:
@@ -216,24 +491,20 @@ class YashCore:
             self.logger.error(f"Failed to create instance: {str(e)}")
             raise
 
-    def _check_system_resources(self, requested_memory: str) -> bool:
+    def _check_system_resources(self, requested_memory: str, available_memory: Optional[int] = None,
+                                cpu_count: Optional[int] = None) -> bool:
         """Check if system has sufficient resources."""
         try:
             # Convert memory string to bytes
-            mem_value = int(requested_memory[:-1])
-            mem_unit = requested_memory[-1].lower()
-            mem_multiplier = {
-                'k': 1024,
-                'm': 1024 * 1024,
-                'g': 1024 * 1024 * 1024
-            }
-            requested_bytes = mem_value * mem_multiplier.get(mem_unit, 1)
+            requested_bytes = _parse_memory(requested_memory)
             
-            # Get available system memory
-            available_memory = psutil.virtual_memory().available
+            # Callers checking a batch pass one snapshot instead of re-querying per item
+            if available_memory is None:
+                available_memory = _available_memory(int(time.monotonic() * 2))
+            if cpu_count is None:
+                cpu_count = _cpu_count()
             
             # Check CPU cores
-            cpu_count = psutil.cpu_count()
             if cpu_count < 2:
                 self.logger.warning("Insufficient CPU cores")
                 return False
@@ -260,31 +531,93 @@ class YashCore:
     def stop_instance(self, instance_id: str) -> bool:
         """Stop an EarnApp instance."""
         try:
-            container = self.docker_client.containers.get(f"yashaoxen_earnapp_{instance_id}")
-            container.stop()
-            container.remove()
+            api = self.docker_client.api
+            api.stop(f"yashaoxen_earnapp_{instance_id}")
+            api.remove_container(f"yashaoxen_earnapp_{instance_id}")
+            self._stop_stats_pumps([instance_id])
+            self._invalidate_instances()
             self.logger.info(f"Stopped instance {instance_id}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to stop instance {instance_id}: {str(e)}")
             return False
 
+    @staticmethod
+    def _summarize_stats(stats: Dict) -> Dict:
+        """Pick the reported fields out of a raw stats frame."""
+        return {
+            "cpu_usage": stats["cpu_stats"]["cpu_usage"]["total_usage"],
+            "memory_usage": stats["memory_stats"]["usage"],
+            "memory_limit": stats["memory_stats"]["limit"],
+            "network_rx": stats["networks"]["eth0"]["rx_bytes"],
+            "network_tx": stats["networks"]["eth0"]["tx_bytes"]
+        }
+
+    def _stats_pump(self, instance_id: str, stop: threading.Event) -> None:
+        """Follow an instance's stats stream, keeping only the latest frame, until stop is set."""
+        try:
+            frames = self.docker_client.api.stats(f"yashaoxen_earnapp_{instance_id}", stream=True, decode=True)
+            for frame in frames:
+                if stop.is_set():
+                    frames.close()
+                    break
+                try:
+                    summary = self._summarize_stats(frame)
+                except KeyError:
+                    continue  # first frame of a starting container can be partial
+                with self._stats_lock:
+                    # Don't resurrect a frame for a pump that was stopped meanwhile
+                    if self._stats_pumps.get(instance_id) is stop:
+                        self._latest_stats[instance_id] = summary
+        except Exception as e:
+            self.logger.warning(f"Stats stream for instance {instance_id} ended: {str(e)}")
+        # Stream ends when the container stops; the next request starts a new one
+        with self._stats_lock:
+            # A stopped pump may already have been replaced by a newer one
+            if self._stats_pumps.get(instance_id) is stop:
+                del self._stats_pumps[instance_id]
+                self._latest_stats.pop(instance_id, None)
+
+    def _stop_stats_pumps(self, instance_ids: Optional[Iterable[str]] = None) -> None:
+        """Stop the stats pumps for the given instances, or for all of them."""
+        with self._stats_lock:
+            instance_ids = list(self._stats_pumps if instance_ids is None else instance_ids)
+            stops = [self._stats_pumps.pop(i, None) for i in instance_ids]
+            for instance_id in instance_ids:
+                self._latest_stats.pop(instance_id, None)
+        for stop in stops:
+            if stop is not None:
+                stop.set()
+
     def get_instance_stats(self, instance_id: str) -> Optional[Dict]:
         """Get statistics for a specific instance."""
+        with self._stats_lock:
+            latest = self._latest_stats.get(instance_id)
+            if latest is not None:
+                return latest
+            stop = None
+            if instance_id not in self._stats_pumps and len(self._stats_pumps) < MAX_STATS_PUMPS:
+                stop = self._stats_pumps[instance_id] = threading.Event()
         try:
-            container = self.docker_client.containers.get(f"yashaoxen_earnapp_{instance_id}")
-            stats = container.stats(stream=False)
-            return {
-                "cpu_usage": stats["cpu_stats"]["cpu_usage"]["total_usage"],
-                "memory_usage": stats["memory_stats"]["usage"],
-                "memory_limit": stats["memory_stats"]["limit"],
-                "network_rx": stats["networks"]["eth0"]["rx_bytes"],
-                "network_tx": stats["networks"]["eth0"]["tx_bytes"]
-            }
+            if stop is not None:
+                # Later requests read the streamed frame instead of waiting ~1s for a sample
+                threading.Thread(target=self._stats_pump, args=(instance_id, stop), daemon=True).start()
+            # Query by name directly; containers.get() would inspect first
+            stats = self.docker_client.api.stats(f"yashaoxen_earnapp_{instance_id}", stream=False)
+            return self._summarize_stats(stats)
         except Exception as e:
             self.logger.error(f"Failed to get stats for instance {instance_id}: {str(e)}")
             return None
 
+    def get_all_instance_stats(self) -> Dict[str, Optional[Dict]]:
+        """Get statistics for every running instance, keyed by instance name."""
+        names = [
+            c["Names"][0].lstrip("/").replace("yashaoxen_earnapp_", "")
+            for c in self._instance_summaries()
+        ]
+        # Each stats call blocks for its ~1s sample window, so take them together
+        return dict(zip(names, self._executor.map(self.get_instance_stats, names)))
+
     def rotate_proxy(self, instance_id: str, new_proxy_url: str) -> bool:
         """Rotate proxy for an instance."""
         try:
@@ -294,8 +627,8 @@ class YashCore:
             if not self.security.verify_proxy(new_proxy_url):
                 raise ValueError("Invalid proxy")
             
-            self.stop_instance(instance_id)
-            self.start_instance(instance_id)
+            # One replace step; start_instance would bring it back without any proxy
+            self._recreate_with_proxy(instance_id, new_proxy_url)
             self.logger.info(f"Rotated proxy for {instance_id}")
             return True
         except Exception as e:
@@ -310,40 +643,45 @@ class YashCore:
         except Exception as e:
             self.logger.error(f"Failed to perform cleanup: {str(e)}")
 
-    def check_installation(self) -> Dict[str, bool]:
-        """Check if all components are properly installed and configured."""
-        status = {
-            "docker_available": False,
-            "config_exists": False,
-            "logs_writable": False,
-            "network_configured": False,
-            "security_configured": False
+    def check_installation(self, only: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """Check if all components are properly installed and configured; `only` limits it to the named checks."""
+        checks = {
+            "docker_available": self._check_docker,
+            "config_exists": self._check_config,
+            "logs_writable": self._check_logs,
+            "network_configured": self._check_network_config,
+            "security_configured": self._check_security_config
         }
+        if only is None:
+            cached = self._install_check_cache
+            if cached and time.monotonic() - cached[0] < INSTALL_CHECK_TTL:
+                return dict(cached[1])
+        else:
+            only = set(only)
+            checks = {name: check for name, check in checks.items() if name in only}
         
-        try:
-            # Check Docker
-            status["docker_available"] = self._check_docker()
-            
-            # Check configuration
-            status["config_exists"] = self._check_config()
-            
-            # Check logs
-            log_path = Path("/var/log/yashaoxen")
-            status["logs_writable"] = os.access(log_path, os.W_OK)
-            
-            # Check network configuration
-            status["network_configured"] = self._check_network_config()
-            
-            # Check security configuration
-            status["security_configured"] = self._check_security_config()
-            
-        except Exception as e:
-            self.logger.error(f"Installation check failed: {str(e)}")
-            
-        return status
+        # The checks are independent socket/subprocess waits; run them side by side
+        futures = {name: self._executor.submit(check) for name, check in checks.items()}
+        status = {}
+        for name, future in futures.items():
+            try:
+                status[name] = future.result()
+            except Exception as e:
+                self.logger.error(f"Installation check {name} failed: {str(e)}")
+                status[name] = False
+        
+        if only is None:
+            self._install_check_cache = (time.monotonic(), status)
+        return dict(status)
+
+    def _check_logs(self) -> bool:
+        """Check if the log directory is writable."""
+        return os.access(Path("/var/log/yashaoxen"), os.W_OK)
 
     def _check_docker(self) -> bool:
         """Check if Docker is properly installed and running."""
+        if self._instance_state is not None:
+            return True  # the live event stream already proves the daemon is reachable
         try:
             self.docker_client.ping()
             return True
@@ -358,11 +696,16 @@ class YashCore:
                 self.logger.warning("No proxies configured")
                 return False
             
-            # Check if all instances can be started
-            for proxy in self.proxies:
-                if not self._check_system_resources(proxy):
-                    self.logger.warning(f"Insufficient resources for proxy: {proxy}")
-                    return False
+            # Check the configured instances fit; the requirement is the same for every proxy
+            earnapp = self.config.get("earnapp", {})
+            memory_limit = earnapp.get("memory_limit", "1g")
+            if not _MEM_RE.fullmatch(memory_limit.strip()):
+                self.logger.warning(f"Invalid memory limit: {memory_limit}")
+                return False
+            instances = earnapp.get("instances", 1)
+            if not self._check_system_resources(f"{_parse_memory(memory_limit) * instances}"):
+                self.logger.warning(f"Insufficient resources for {instances} instances of {memory_limit}")
+                return False
             
             return True
         except Exception as e:
@@ -377,10 +720,7 @@ class YashCore:
                 ip_forward = f.read().strip() == "1"
             
             # Check iptables
-            iptables_check = subprocess.run(
-                ["iptables", "-L", "YASHAOXEN"],
-                capture_output=True
-            ).returncode == 0
+            iptables_check = _command_succeeds(("iptables", "-L", "YASHAOXEN"), _check_epoch())
             
             return ip_forward and iptables_check
             
@@ -391,10 +731,7 @@ class YashCore:
         """Check if security measures are properly configured."""
         try:
             # Check AppArmor
-            apparmor_status = subprocess.run(
-                ["apparmor_status"],
-                capture_output=True
-            ).returncode == 0
+            apparmor_status = _command_succeeds(("apparmor_status",), _check_epoch())
             
             # Check seccomp
             seccomp_status = os.path.exists("/etc/docker/seccomp-profiles")
@@ -1,11 +1,20 @@
 import os
 import sys
+import shlex
 import subprocess
 import platform
 from pathlib import Path
 from typing import Dict, List, Tuple
 import logging
 
+DEBIAN_PACKAGES = (
+    "python3.8", "python3-pip", "python3-venv", "docker.io", "docker-compose",
+    "iptables", "net-tools", "curl", "wget",
+)
+
+# Keeps apt and debconf from stopping to prompt
+_APT_ENV = {**os.environ, "DEBIAN_FRONTEND": "noninteractive"}
+
 class Installer:
     def __init__(self):
         self.logger = self._setup_logging()
@@ -98,16 +107,9 @@ class Installer:
     def _install_debian_dependencies(self) -> bool:
         """Install dependencies for Debian-based systems."""
         try:
-            commands = [
-                "apt-get update",
-                "DEBIAN_FRONTEND=noninteractive apt-get install -y python3.8 python3-pip python3-venv docker.io docker-compose iptables net-tools curl wget"
-            ]
-            
-            for cmd in commands:
-                result = subprocess.run(cmd.split(), check=True)
-                if result.returncode != 0:
-                    return False
-            
+            # The env var has to go in env=; as the first argv word it was exec'd as a program
+            subprocess.run(["apt-get", "update"], env=_APT_ENV, check=True)
+            subprocess.run(["apt-get", "install", "-y", *DEBIAN_PACKAGES], env=_APT_ENV, check=True)
             return True
             
         except subprocess.CalledProcessError as e:
@@ -160,19 +162,18 @@ export PATH=$YASHAOXEN_HOME/venv/bin:$PATH
             self.logger.error(f"Failed to setup Python environment: {str(e)}")
             return False
 
+    def _run_script(self, *commands: List[str]) -> None:
+        """Run commands in order in one shell, stopping at the first failure."""
+        script = "\n".join(" ".join(shlex.quote(arg) for arg in cmd) for cmd in commands)
+        subprocess.run(["sh", "-e"], input=script, text=True, env=_APT_ENV, check=True)
+
     def configure_docker(self) -> bool:
         """Configure Docker service and permissions."""
         try:
-            commands = [
-                "systemctl start docker",
-                "systemctl enable docker",
-                f"usermod -aG docker {os.environ.get('SUDO_USER', 'root')}"
-            ]
-            
-            for cmd in commands:
-                result = subprocess.run(cmd.split(), check=True)
-                if result.returncode != 0:
-                    return False
+            self._run_script(
+                ["systemctl", "enable", "--now", "docker"],
+                ["usermod", "-aG", "docker", os.environ.get('SUDO_USER', 'root')]
+            )
             
             # Test Docker
             test_result = subprocess.run(
@@ -235,9 +236,6 @@ net.ipv4.tcp_slow_start_after_idle = 0
             with open("/etc/sysctl.d/99-yashaoxen.conf", "w") as f:
                 f.write(sysctl_config)
             
-            # Apply sysctl settings
-            subprocess.run(["sysctl", "-p", "/etc/sysctl.d/99-yashaoxen.conf"], check=True)
-            
             # Configure iptables
             iptables_rules = """*filter
 :INPUT ACCEPT [0:0]
@@ -274,14 +272,16 @@ COMMIT
             with open("/etc/iptables/rules.v4", "w") as f:
                 f.write(iptables_rules)
             
-            # Apply iptables rules
-            subprocess.run(["iptables-restore", "/etc/iptables/rules.v4"], check=True)
-            
-            # Make iptables rules persistent
+            # Apply sysctl settings and iptables rules, then make the rules persistent
             if os.path.exists("/etc/debian_version"):
-                subprocess.run(["apt-get", "install", "-y", "iptables-persistent"], check=True)
+                persist = ["apt-get", "install", "-y", "iptables-persistent"]
             else:
-                subprocess.run(["service", "iptables", "save"], check=True)
+                persist = ["service", "iptables", "save"]
+            self._run_script(
+                ["sysctl", "-p", "/etc/sysctl.d/99-yashaoxen.conf"],
+                ["iptables-restore", "/etc/iptables/rules.v4"],
+                persist
+            )
             
             return True
             
@@ -1,18 +1,69 @@
+import os
 import re
 import json
+import hashlib
+import itertools
+import tempfile
+import time
 import logging
+import threading
 import requests
-from typing import List, Optional
-from urllib.parse import urlparse
+import urllib3
+from urllib.parse import unquote
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from pathlib import Path
 
+# scheme://[user:pass@]host:port[/path], schemes the probe can use; host may be a bracketed IPv6 literal
+_PROXY_RE = re.compile(r'(socks5|https?)://(?:[^@/\s]+@)?(?:\[[0-9a-fA-F:.]+\]|[^:/@\s\[\]]+):(\d{1,5})(?:/\S*)?')
+
+# Seconds a health check result is trusted before the proxy is probed again
+HEALTH_TTL = 60
+
+# Per-probe timeout, in seconds, for health checks
+HEALTH_TIMEOUT = 5
+
 class ProxyManager:
-    def __init__(self, proxy_file: str = "/etc/yashaoxen/proxies.txt"):
+    def __init__(self, proxy_file: str = "/etc/yashaoxen/proxies.txt",
+                 proxies: Optional[List[str]] = None):
         self.logger = logging.getLogger("ProxyManager")
         self.proxy_file = Path(proxy_file)
         self.proxies: List[str] = []
-        self.current_index = 0
-        self._load_proxies()
+        # Mirrors self.proxies for O(1) membership checks
+        self._proxy_set = set()
+        # Digest of the last list written to proxy_file, to skip identical rewrites
+        self._saved_digest = None
+        # Round-robin iterator over self.proxies; rebuilt whenever the list changes
+        self._cycle = None
+        # proxy_url -> (checked_at, healthy)
+        self._health_cache: Dict[str, tuple] = {}
+        # proxy_url -> urllib3 pool kept for the proxy's lifetime in the list, so probes reuse connections
+        self._probe_pools: Dict[str, urllib3.PoolManager] = {}
+        self._probe_lock = threading.Lock()
+        self.session = self._setup_session()
+        if proxies is not None:
+            # Caller already parsed the list; skip re-reading the file
+            self._set_proxies(proxies)
+        else:
+            self._load_proxies()
+
+    def _setup_session(self) -> requests.Session:
+        """Set up a pooled session reused by every proxy probe"""
+        session = requests.Session()
+        # Each proxy gets its own keep-alive pool; size it to the health-check fan-out
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+        with self._probe_lock:
+            pools, self._probe_pools = self._probe_pools, {}
+        for pool in pools.values():
+            pool.clear()
 
     def _load_proxies(self):
         """Load proxies from file"""
@@ -20,20 +71,31 @@ class ProxyManager:
             self.logger.warning(f"Proxy file {self.proxy_file} not found")
             return
 
-        with open(self.proxy_file) as f:
-            self.proxies = [line.strip() for line in f if line.strip()]
+        lines = map(bytes.strip, self.proxy_file.read_bytes().splitlines())
+        self._set_proxies(line.decode() for line in lines if line)
         
         self.logger.info(f"Loaded {len(self.proxies)} proxies")
 
+    def _set_proxies(self, proxies):
+        """Replace the proxy list, dropping duplicates but keeping order"""
+        self.proxies = list(dict.fromkeys(proxies))
+        self._proxy_set = set(self.proxies)
+        self._reset_cycle()
+        with self._probe_lock:
+            stale = [url for url in self._probe_pools if url not in self._proxy_set]
+            for url in stale:
+                self._probe_pools.pop(url).clear()
+
+    def _reset_cycle(self):
+        """Restart the rotation over the current proxy list"""
+        self._cycle = itertools.cycle(self.proxies) if self.proxies else None
+
     def validate_proxy(self, proxy_url: str) -> bool:
         """Validate proxy URL format and connectivity"""
         try:
             # Validate URL format
-            parsed = urlparse(proxy_url)
-            if not all([parsed.scheme, parsed.hostname, parsed.port]):
-                return False
-            
-            if parsed.scheme not in ['socks5', 'http', 'https']:
+            match = _PROXY_RE.fullmatch(proxy_url)
+            if not match or int(match.group(2)) > 65535:
                 return False
 
             # Test proxy connectivity
@@ -42,7 +104,7 @@ class ProxyManager:
                 'https': proxy_url
             }
             
-            response = requests.get(
+            response = self.session.get(
                 'http://ip-api.com/json',
                 proxies=proxies,
                 timeout=10
@@ -62,20 +124,23 @@ class ProxyManager:
             self.logger.error(f"Proxy validation failed for {proxy_url}: {e}")
             return False
 
+    def validate_many(self, proxy_urls: List[str]) -> Dict[str, bool]:
+        """Validate many proxies concurrently, keyed by proxy URL"""
+        urls = list(dict.fromkeys(proxy_urls))
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(urls)))) as pool:
+            return dict(zip(urls, pool.map(self.validate_proxy, urls)))
+
     def get_next_proxy(self) -> Optional[str]:
         """Get next proxy in rotation"""
-        if not self.proxies:
-            return None
-
-        proxy = self.proxies[self.current_index]
-        self.current_index = (self.current_index + 1) % len(self.proxies)
-        return proxy
+        return next(self._cycle) if self._cycle else None
 
     def add_proxy(self, proxy_url: str):
         """Add new proxy to the list"""
         if self.validate_proxy(proxy_url):
-            if proxy_url not in self.proxies:
+            if proxy_url not in self._proxy_set:
                 self.proxies.append(proxy_url)
+                self._proxy_set.add(proxy_url)
+                self._reset_cycle()
                 self._save_proxies()
                 self.logger.info(f"Added new proxy: {proxy_url}")
         else:
@@ -83,32 +148,81 @@ class ProxyManager:
 
     def remove_proxy(self, proxy_url: str):
         """Remove proxy from the list"""
-        if proxy_url in self.proxies:
+        if proxy_url in self._proxy_set:
             self.proxies.remove(proxy_url)
+            self._proxy_set.discard(proxy_url)
+            self._reset_cycle()
+            self._health_cache.pop(proxy_url, None)
+            with self._probe_lock:
+                pool = self._probe_pools.pop(proxy_url, None)
+            if pool is not None:
+                pool.clear()
             self._save_proxies()
             self.logger.info(f"Removed proxy: {proxy_url}")
 
     def _save_proxies(self):
         """Save proxies to file"""
+        blob = '\n'.join(self.proxies).encode()
+        digest = hashlib.blake2b(blob, digest_size=8).digest()
+        if digest == self._saved_digest:
+            return
+
+        # Write a temp file and rename it over the old one, so a crash never leaves half a list
         self.proxy_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.proxy_file, 'w') as f:
-            f.write('\n'.join(self.proxies))
+        # mkstemp gives every writer its own 0600 file, even threads of one process
+        fd, tmp = tempfile.mkstemp(dir=self.proxy_file.parent, prefix=f"{self.proxy_file.name}.", suffix=".tmp")
+        try:
+            try:
+                os.write(fd, blob)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp, self.proxy_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._saved_digest = digest
 
     def check_proxy_health(self, proxy_url: str) -> bool:
-        """Check if proxy is healthy"""
+        """Check if proxy is healthy, reusing a result younger than HEALTH_TTL"""
+        cached = self._health_cache.get(proxy_url)
+        if cached and time.monotonic() - cached[0] < HEALTH_TTL:
+            return cached[1]
+        healthy = self._probe_health(proxy_url)
+        self._health_cache[proxy_url] = (time.monotonic(), healthy)
+        return healthy
+
+    def _probe_pool(self, proxy_url: str):
+        """Get or create the urllib3 pool that routes through proxy_url"""
+        with self._probe_lock:
+            pool = self._probe_pools.get(proxy_url)
+            if pool is None:
+                pool = self._new_probe_pool(proxy_url)
+                # Only listed proxies are kept; one-off URLs would pile up otherwise
+                if proxy_url in self._proxy_set:
+                    self._probe_pools[proxy_url] = pool
+            return pool
+
+    def _new_probe_pool(self, proxy_url: str) -> urllib3.PoolManager:
+        """Build a urllib3 pool that routes through proxy_url, including its credentials"""
+        options = dict(num_pools=1, maxsize=1, timeout=HEALTH_TIMEOUT, retries=False)
+        if proxy_url.startswith('socks'):
+            # SOCKSProxyManager reads user:pass from the URL itself
+            from urllib3.contrib.socks import SOCKSProxyManager
+            return SOCKSProxyManager(proxy_url, **options)
+        # Unlike requests, ProxyManager ignores user:pass in the URL; send it as Proxy-Authorization
+        auth = urllib3.util.parse_url(proxy_url).auth
+        if auth:
+            options['proxy_headers'] = urllib3.make_headers(proxy_basic_auth=unquote(auth))
+        return urllib3.ProxyManager(proxy_url, **options)
+
+    def _probe_health(self, proxy_url: str) -> bool:
+        """Probe a proxy over the network"""
         try:
-            proxies = {
-                'http': proxy_url,
-                'https': proxy_url
-            }
-            
-            response = requests.get(
-                'http://ip-api.com/json',
-                proxies=proxies,
-                timeout=5
-            )
-            
-            return response.status_code == 200
+            # Plain urllib3: no cookies, hooks or redirects to process, and only the status matters
+            pool = self._probe_pool(proxy_url)
+            response = pool.request('HEAD', 'http://ip-api.com/json', redirect=False)
+            return response.status == 200
 
         except Exception as e:
             self.logger.error(f"Health check failed for proxy {proxy_url}: {e}")
@@ -122,7 +236,7 @@ class ProxyManager:
                 'https': proxy_url
             }
             
-            response = requests.get(
+            response = self.session.get(
                 'http://ip-api.com/json',
                 proxies=proxies,
                 timeout=5
@@ -137,22 +251,29 @@ class ProxyManager:
             self.logger.error(f"Failed to get proxy info for {proxy_url}: {e}")
             return {}
 
+    def _check_all(self) -> Dict[str, bool]:
+        """Health-check every proxy concurrently, keyed by proxy URL"""
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(self.proxies)))) as pool:
+            return dict(zip(self.proxies, pool.map(self.check_proxy_health, self.proxies)))
+
     def cleanup_dead_proxies(self):
         """Remove non-working proxies from the list"""
         working_proxies = []
+        results = self._check_all()
         for proxy in self.proxies:
-            if self.check_proxy_health(proxy):
+            if results[proxy]:
                 working_proxies.append(proxy)
             else:
                 self.logger.warning(f"Removing dead proxy: {proxy}")
         
-        self.proxies = working_proxies
+        self._set_proxies(working_proxies)
         self._save_proxies()
 
     def get_proxy_stats(self) -> dict:
         """Get statistics about proxies"""
         total = len(self.proxies)
-        working = sum(1 for p in self.proxies if self.check_proxy_health(p))
+        results = self._check_all()
+        working = sum(results[p] for p in self.proxies)
         
         return {
             "total": total,
@@ -3,60 +3,174 @@ YashaoXen Security Manager
 """
 
 import os
+import sys
+import copy
 import json
+import bisect
 import logging
+import ipaddress
+import tempfile
+import threading
 from typing import Dict, List, Optional
 
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Reused simdjson parser; each parse invalidates the previous document
+_PARSER = simdjson.Parser() if simdjson is not None else None
+_PARSER_LOCK = threading.Lock()
+
+def _parse_json(blob: bytes) -> Dict:
+    """Parse JSON bytes with the fastest available parser."""
+    if _PARSER is not None:
+        with _PARSER_LOCK:
+            return _PARSER.parse(blob).as_dict()
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
+
+# Safeguards written on first run and used when the file can't be read
+_DEFAULT_SAFEGUARDS = {
+    "max_instances": 10,
+    "memory_limit": "512m",
+    "cpu_limit": "0.5",
+    "network_isolation": True,
+    "proxy_verification": True,
+    "device_verification": True,
+    "auto_update": True,
+    "allowed_countries": ["US", "CA", "GB", "DE", "FR", "IT", "ES", "NL", "SE", "AU"],
+    "blocked_ips": [],
+    "security_checks": {
+        "verify_proxy_ssl": True,
+        "verify_proxy_anonymity": True,
+        "check_proxy_location": True,
+        "monitor_traffic": True
+    }
+}
+
+# Docker security_opt entries applied to every container
+_CONTAINER_SEC_OPTS = ("no-new-privileges=true", "seccomp=unconfined")
+
 class SecurityManager:
+    # Fixed attribute layout: no per-instance __dict__ on the verification hot path
+    __slots__ = ("logger", "config_dir", "safeguards_file", "_safeguards",
+                 "_safeguards_mtime", "_allowed_countries", "_blocked_ips",
+                 "_blocked_ranges")
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.config_dir = "/etc/yashaoxen"
         self.safeguards_file = os.path.join(self.config_dir, "safeguards.json")
+        # Read on first use rather than here; mtime of the file they came from
+        self._safeguards: Optional[Dict] = None
+        self._safeguards_mtime: Optional[int] = None
+
+    @property
+    def safeguards(self) -> Dict:
+        """Current safeguards, reloaded when the file changes."""
         self._load_safeguards()
+        return self._safeguards
 
     def _load_safeguards(self) -> None:
-        """Load security safeguards from configuration file."""
+        """Load security safeguards from configuration file if it changed."""
+        mtime = None
         try:
-            if not os.path.exists(self.safeguards_file):
+            try:
+                mtime = os.stat(self.safeguards_file).st_mtime_ns
+            except FileNotFoundError:
                 self._create_default_safeguards()
-            
-            with open(self.safeguards_file, 'r') as f:
-                self.safeguards = json.load(f)
+                mtime = os.stat(self.safeguards_file).st_mtime_ns
+            if self._safeguards is not None and mtime == self._safeguards_mtime:
+                return
+
+            with open(self.safeguards_file, 'rb') as f:
+                self._safeguards = _parse_json(f.read())
         except Exception as e:
-            self.logger.error(f"Failed to load safeguards: {e}")
-            self.safeguards = self._get_default_safeguards()
+            self.logger.error("Failed to load safeguards: %s", e)
+            # Don't retry a broken file until it changes again
+            self._safeguards_mtime = mtime
+            if self._safeguards is not None:
+                # Keep serving the last good copy
+                return
+            self._safeguards = self._get_default_safeguards()
+        else:
+            self._safeguards_mtime = mtime
+        self._index_safeguards()
+
+    def _index_safeguards(self) -> None:
+        """Build the lookup sets behind is_country_allowed and is_ip_blocked."""
+        # Upper-cased and interned once here so lookups never normalize the stored side
+        self._allowed_countries = frozenset(sys.intern(c.upper()) for c in self._safeguards.get("allowed_countries", ()))
+        self._blocked_ips = frozenset(self._safeguards.get("blocked_ips", ()))
+        self._blocked_ranges = self._index_blocked_ranges(self._blocked_ips)
+
+    def _index_blocked_ranges(self, entries) -> Dict[int, tuple]:
+        """Map IP version -> (sorted range starts, matching range ends) for blocked_ips."""
+        networks = {4: [], 6: []}
+        for entry in entries:
+            try:
+                net = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                self.logger.warning("Ignoring invalid blocked_ips entry: %s", entry)
+                continue
+            networks[net.version].append(net)
+        ranges = {}
+        for version, nets in networks.items():
+            # Collapsed networks are sorted and disjoint, so one bisect finds the candidate
+            collapsed = list(ipaddress.collapse_addresses(nets))
+            ranges[version] = ([int(n.network_address) for n in collapsed],
+                               [int(n.broadcast_address) for n in collapsed])
+        return ranges
 
     def _create_default_safeguards(self) -> None:
         """Create default safeguards configuration file."""
         os.makedirs(self.config_dir, exist_ok=True)
-        with open(self.safeguards_file, 'w') as f:
-            json.dump(self._get_default_safeguards(), f, indent=4)
+        # First-run file is meant to be read and edited by hand, so pretty-print it
+        self._write_safeguards(json.dumps(_DEFAULT_SAFEGUARDS, indent=4).encode())
+
+    def _write_safeguards(self, blob: bytes) -> None:
+        """Atomically replace the safeguards file with blob."""
+        # Write a temp file and rename it over the old one, so a crash never leaves a torn file.
+        # mkstemp gives each writer, thread or process, its own 0600 file.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.safeguards_file), prefix="safeguards.json.", suffix=".tmp")
+        try:
+            try:
+                os.write(fd, blob)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp, self.safeguards_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
 
     def _get_default_safeguards(self) -> Dict:
         """Get default security safeguards."""
-        return {
-            "max_instances": 10,
-            "memory_limit": "512m",
-            "cpu_limit": "0.5",
-            "network_isolation": True,
-            "proxy_verification": True,
-            "device_verification": True,
-            "auto_update": True,
-            "allowed_countries": ["US", "CA", "GB", "DE", "FR", "IT", "ES", "NL", "SE", "AU"],
-            "blocked_ips": [],
-            "security_checks": {
-                "verify_proxy_ssl": True,
-                "verify_proxy_anonymity": True,
-                "check_proxy_location": True,
-                "monitor_traffic": True
-            }
-        }
+        # Deep copy: callers merge updates into the nested dicts and lists
+        return copy.deepcopy(_DEFAULT_SAFEGUARDS)
 
     def verify_proxy(self, proxy: str) -> bool:
         """Verify if a proxy meets security requirements."""
         if not self.safeguards["proxy_verification"]:
             return True
-        
+        return self._check_proxy(proxy)
+
+    def verify_proxies(self, proxies: List[str]) -> List[bool]:
+        """Verify many proxies, reading the safeguards once for the whole batch."""
+        if not self.safeguards["proxy_verification"]:
+            return [True] * len(proxies)
+        check = self._check_proxy
+        return [check(proxy) for proxy in proxies]
+
+    def _check_proxy(self, proxy: str) -> bool:
+        """Run the proxy checks, assuming proxy verification is enabled."""
         try:
             # Basic proxy format validation
             if not proxy or not isinstance(proxy, str):
@@ -66,28 +180,36 @@ class SecurityManager:
             # This is a placeholder that always returns True
             return True
         except Exception as e:
-            self.logger.error(f"Proxy verification failed: {e}")
+            self.logger.error("Proxy verification failed: %s", e)
             return False
 
     def verify_device(self, device_id: str) -> bool:
         """Verify if a device meets security requirements."""
         if not self.safeguards["device_verification"]:
             return True
-        
+        return self._check_device(device_id)
+
+    def verify_devices(self, device_ids: List[str]) -> List[bool]:
+        """Verify many devices, reading the safeguards once for the whole batch."""
+        if not self.safeguards["device_verification"]:
+            return [True] * len(device_ids)
+        check = self._check_device
+        return [check(device_id) for device_id in device_ids]
+
+    def _check_device(self, device_id: str) -> bool:
+        """Run the device checks, assuming device verification is enabled."""
         try:
             # Add your device verification logic here
             # This is a placeholder that always returns True
             return True
         except Exception as e:
-            self.logger.error(f"Device verification failed: {e}")
+            self.logger.error("Device verification failed: %s", e)
             return False
 
     def get_container_security_opts(self) -> List[str]:
         """Get security options for Docker containers."""
-        return [
-            "no-new-privileges=true",
-            "seccomp=unconfined"
-        ]
+        # docker-py requires a list here, so hand out a fresh one
+        return list(_CONTAINER_SEC_OPTS)
 
     def get_resource_limits(self) -> Dict[str, str]:
         """Get resource limits for containers."""
@@ -101,20 +223,38 @@ class SecurityManager:
         try:
             # Merge new safeguards with existing ones
             self.safeguards.update(new_safeguards)
+            self._index_safeguards()
             
-            # Save to file
-            with open(self.safeguards_file, 'w') as f:
-                json.dump(self.safeguards, f, indent=4)
+            # Save to file, serialized in one go
+            if orjson is None:
+                blob = json.dumps(self._safeguards, separators=(',', ':')).encode()
+            else:
+                blob = orjson.dumps(self._safeguards)
+            self._write_safeguards(blob)
+            # The file now matches memory; don't re-parse our own write
+            self._safeguards_mtime = os.stat(self.safeguards_file).st_mtime_ns
             
             return True
         except Exception as e:
-            self.logger.error(f"Failed to update safeguards: {e}")
+            self.logger.error("Failed to update safeguards: %s", e)
             return False
 
     def is_country_allowed(self, country_code: str) -> bool:
         """Check if a country is allowed."""
-        return country_code.upper() in self.safeguards["allowed_countries"]
+        self._load_safeguards()
+        # Codes usually arrive upper-case already; only normalize on a miss
+        return country_code in self._allowed_countries or country_code.upper() in self._allowed_countries
 
     def is_ip_blocked(self, ip: str) -> bool:
-        """Check if an IP is blocked."""
-        return ip in self.safeguards["blocked_ips"] 
\ No newline at end of file
+        """Check if an IP is blocked, either listed directly or inside a blocked CIDR."""
+        self._load_safeguards()
+        if ip in self._blocked_ips:
+            return True
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        starts, ends = self._blocked_ranges[addr.version]
+        value = int(addr)
+        i = bisect.bisect_right(starts, value) - 1
+        return i >= 0 and value <= ends[i] 
\ No newline at end of file